@@ -2,8 +2,9 @@ from typing import Any, Dict, Type
 
 from .cmn import CmnExtractor
 from .fin import FinExtractor
+from .runner import extract_corpus
 
-__all__ = ["CmnExtractor", "FinExtractor", "get_extractor"]
+__all__ = ["CmnExtractor", "FinExtractor", "extract_corpus", "get_extractor"]
 
 
 _registry: Dict[str, Type] = {}
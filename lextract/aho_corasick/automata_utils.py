@@ -1,17 +1,50 @@
 from copy import copy
+from typing import Any, Dict, List, Optional, Tuple
 
 
-def conf_net_search(auto, conf_net, elem_id_fn=lambda x: x):
+def advance_route(auto, route: Tuple, opt) -> Tuple:
+    """
+    Given the route from the start node to some node of `auto`, returns the
+    route to the node reached after `opt`: the longest suffix of the extended
+    route which is still a prefix of some word in the automaton.
+    """
+    route += (opt,)
+    for start in range(len(route)):
+        if auto.match(route[start:]):
+            return route[start:]
+    return ()
+
+
+def undominated(auto_its: Dict[Any, Any], routes: Dict[Any, Tuple]):
+    """
+    Filters out the pointers in `auto_its`, keyed by position id, which are
+    dominated, i.e. whose route is a proper suffix of the route of another
+    pointer.
+    """
+    suffixes = set()
+    for pos_id in auto_its:
+        route = routes[pos_id]
+        for start in range(1, len(route) + 1):
+            suffixes.add(route[start:])
+    return {
+        pos_id: auto_it
+        for pos_id, auto_it in auto_its.items()
+        if routes[pos_id] not in suffixes
+    }
+
+
+def conf_net_search(
+    auto, conf_net, elem_id_fn=lambda x: x, live_pointers: Optional[List[int]] = None
+):
     """
     Searches a confusion network (encoded as an iterable of iterables) with an
     Aho-Corasick Automaton (ACA). It does this by keeping several pointers into
     the ACA. Pointer uniqueness is maintained.
 
-    Theoretically, we can remove dominated nodes, which are redundant, Given
-    some pointer which has a some route r_1 from the start node, it is
-    dominated by a pointer with route r_2 from the start node if r_1 is a
-    suffix of r_2 and r_2 is longer than r_1. So if we have pointers and routes
-    like so:
+    Dominated pointers are removed, since they are redundant. Given some
+    pointer which has a some route r_1 from the start node, it is dominated by
+    a pointer with route r_2 from the start node if r_1 is a suffix of r_2 and
+    r_2 is longer than r_1. So if we have pointers and routes like so:
 
     start->a->b->c->pointer 1
     start->b->c->pointer 2
@@ -19,26 +52,31 @@ def conf_net_search(auto, conf_net, elem_id_fn=lambda x: x):
 
     Then pointers 2 and 3 are dominated by pointer 1 and pointer 3 is dominated
     by pointer 2. This means that all pointers apart from pointer 1 are
-    redundant.
+    redundant: anything found by following a dominated pointer is also found
+    by following the pointer dominating it. The root pointer has the empty
+    route, and so is dominated by any other pointer.
 
-    Currently, this isn't fully utilised. Instead, the root is removed if there
-    are any other pointers, which is the trivial example of this case.
+    Routes are worked out using `auto.match(...)` and remembered per
+    automaton node. If `live_pointers` is given, the number of pointers kept
+    after each position is appended to it.
     """
     root = auto.iter(())
-    root_id = root.pos_id()
-    auto_its = [root]
+    routes: Dict[Any, Tuple] = {root.pos_id(): ()}
+    # (position id, option) -> position id after taking the option
+    transitions: Dict[Tuple[Any, Any], Any] = {}
+    auto_its = {root.pos_id(): root}
 
     for opts in conf_net:
-        # Don't add the root pointer to begin with
-        seen_auto_its = {root_id}
-        next_auto_its = []
+        next_auto_its: Dict[Any, Any] = {}
         # We can get duplicates with the current scheme, so filter
         elem_ids = set()
         elems = []
-        # Save the current root to ensure the right character index
-        cur_root = None
-        for auto_it in auto_its:
+        for pos_id, auto_it in auto_its.items():
             for opt in opts:
+                # Anything found on reaching a state which has already been
+                # reached at this position has already been found
+                if transitions.get((pos_id, opt)) in next_auto_its:
+                    continue
                 new_auto_it = copy(auto_it)
                 new_auto_it.set((opt,))
                 for elem in new_auto_it:
@@ -48,20 +86,24 @@ def conf_net_search(auto, conf_net, elem_id_fn=lambda x: x):
                     if elem_id not in elem_ids:
                         elem_ids.add(elem_id)
                         elems.append(elem)
-                if new_auto_it.pos_id() not in seen_auto_its:
-                    seen_auto_its.add(new_auto_it.pos_id())
-                    next_auto_its.append(new_auto_it)
-                elif new_auto_it.pos_id() == root_id:
-                    cur_root = new_auto_it
+                new_pos_id = new_auto_it.pos_id()
+                transitions[pos_id, opt] = new_pos_id
+                if new_pos_id not in next_auto_its:
+                    next_auto_its[new_pos_id] = new_auto_it
+                    if new_pos_id not in routes:
+                        routes[new_pos_id] = advance_route(auto, routes[pos_id], opt)
         for elem in elems:
             yield elem
-        # If we end up with nothing, add back the root
-        if len(next_auto_its) == 0:
-            next_auto_its.append(cur_root)
-        auto_its = next_auto_its
+        # If everything fell back to the root, it is kept since it is the
+        # only pointer, which ensures the right character index
+        auto_its = undominated(next_auto_its, routes)
+        if live_pointers is not None:
+            live_pointers.append(len(auto_its))
 
 
-def conf_net_search_simple(auto, conf_net, elem_id_fn=lambda x: x):
+def conf_net_search_simple(
+    auto, conf_net, elem_id_fn=lambda x: x, live_pointers: Optional[List[int]] = None
+):
     """
     As above, but take no account of domination
     """
@@ -89,3 +131,5 @@ def conf_net_search_simple(auto, conf_net, elem_id_fn=lambda x: x):
         for elem in elems:
             yield elem
         auto_its = next_auto_its
+        if live_pointers is not None:
+            live_pointers.append(len(auto_its))
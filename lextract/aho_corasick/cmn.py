@@ -1,5 +1,10 @@
 import re
-from .common import mk_token_auto, mk_substr_auto
+from .common import (
+    auto_cache_path,
+    load_or_build_auto,
+    mk_token_auto,
+    mk_substr_auto,
+)
 from .mw_utils import multiword_variants
 from .gen import extract_auto, extract_tokenized
 from lextract.aho_corasick.models import (
@@ -10,34 +15,38 @@ from lextract.aho_corasick.models import (
 )
 from lextract.wordnet.cmn import Wordnet as WordnetCmn
 from pyahocorasick import TokenAutomaton
+from typing import Optional
 
 
 WHITESPACE_RE = re.compile(r"\s")
 
 
-def mk_cmn_token_auto() -> TokenAutomaton:
-    return mk_token_auto(
-        (
-            (l, wns, (tuple(var.split(" ")) for var in multiword_variants(l)))
-            for l, wns in WordnetCmn.lemma_names().items()
-        )
+def mk_cmn_token_auto(path: Optional[str] = None) -> TokenAutomaton:
+    return load_or_build_auto(
+        path,
+        lambda: mk_token_auto(
+            (
+                (l, wns, (tuple(var.split(" ")) for var in multiword_variants(l)))
+                for l, wns in WordnetCmn.lemma_names().items()
+            )
+        ),
     )
 
 
 class CmnExtractor:
     def __init__(self) -> None:
-        self.untok_auto = mk_substr_auto(WordnetCmn)
-        self.tok_auto = mk_cmn_token_auto()
+        self.untok_auto = mk_substr_auto(WordnetCmn, auto_cache_path("cmn_substr"))
+        self.tok_auto = mk_cmn_token_auto(auto_cache_path("cmn_token"))
 
-    def extract_untok(self, line: str) -> UntokenizedTagging:
-        return extract_auto(line, WordnetCmn, self.untok_auto, "zh-untok")
+    def extract_untok(self, line: str, light: bool = False) -> UntokenizedTagging:
+        return extract_auto(line, WordnetCmn, self.untok_auto, "zh-untok", light)
 
-    def extract_tok(self, line: str) -> TokenizedTagging:
-        return extract_tokenized(line, WordnetCmn, self.tok_auto, "zh-tok")
+    def extract_tok(self, line: str, light: bool = False) -> TokenizedTagging:
+        return extract_tokenized(line, WordnetCmn, self.tok_auto, "zh-tok", light)
 
-    def extract(self, line_untok: str, line_tok: str) -> Tagging:
-        untok_synsets = self.extract_untok(line_untok)
-        tok_synsets = self.extract_tok(line_tok)
+    def extract(self, line_untok: str, line_tok: str, light: bool = False) -> Tagging:
+        untok_synsets = self.extract_untok(line_untok, light)
+        tok_synsets = self.extract_tok(line_tok, light)
 
         def matcher(tok_tok: Anchor, untok_tok: Anchor) -> bool:
             # XXX: Aribitrary argument ordering required
@@ -1,13 +1,80 @@
+import os
+import pickle
 import ahocorasick
 import pyahocorasick
-from typing import Any, Dict, List, Tuple, Type, Iterator, Iterable
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Iterator,
+    Iterable,
+)
 
 from lextract.wordnet import wn_lemma_map, ExtractableWordnet
 from lextract.wordnet.utils import merge_lemma_maps
 from .mw_utils import multiword_variants
 
+# Bump whenever the automata or their payloads change shape
+AUTO_FORMAT_VERSION = 1
 
-def mk_substr_auto(wordnet: Type[ExtractableWordnet]) -> ahocorasick.Automaton:
+AutoT = TypeVar("AutoT")
+
+
+def auto_cache_path(name: str) -> Optional[str]:
+    cache_dir = os.getenv("AUTO_CACHE_DIR")
+    if cache_dir is None:
+        return None
+    return os.path.join(cache_dir, name + ".pickle")
+
+
+def save_auto(auto: Any, path: str) -> None:
+    # Write then rename so that concurrently starting workers never see a
+    # partially written file
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as outf:
+        pickle.dump(AUTO_FORMAT_VERSION, outf)
+        pickle.dump(auto, outf, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_auto(path: str) -> Optional[Any]:
+    """
+    Load an automaton saved with `save_auto`. Returns None if there is none or
+    it was saved with a different AUTO_FORMAT_VERSION.
+    """
+    try:
+        inf = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with inf:
+        if pickle.load(inf) != AUTO_FORMAT_VERSION:
+            return None
+        return pickle.load(inf)
+
+
+def load_or_build_auto(path: Optional[str], build: Callable[[], AutoT]) -> AutoT:
+    if path is not None:
+        auto = load_auto(path)
+        if auto is not None:
+            return auto
+    auto = build()
+    if path is not None:
+        save_auto(auto, path)
+    return auto
+
+
+def mk_substr_auto(
+    wordnet: Type[ExtractableWordnet], path: Optional[str] = None
+) -> ahocorasick.Automaton:
+    return load_or_build_auto(path, lambda: build_substr_auto(wordnet))
+
+
+def build_substr_auto(wordnet: Type[ExtractableWordnet]) -> ahocorasick.Automaton:
     entries: List[Tuple[str, Dict[str, List[str]]]] = []
     for l, wns in wordnet.lemma_names().items():
         lfs = multiword_variants(l)
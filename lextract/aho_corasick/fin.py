@@ -1,4 +1,4 @@
-from .common import mk_token_auto
+from .common import auto_cache_path, load_or_build_auto, mk_token_auto
 from .gen import extract_tokenized_iter
 from finntk.wordnet import has_abbrv
 from finntk.omor.extract import (
@@ -7,12 +7,17 @@ from finntk.omor.extract import (
     extract_lemmas,
 )
 from finntk import get_omorfi, get_token_positions
-from finntk.finnpos import sent_finnpos
+from finntk.finnpos import FinnPOS
+from more_itertools import chunked
 from lextract.aho_corasick.models import TokenizedTagging
 from lextract.aho_corasick.automata_utils import conf_net_search
 from lextract.utils.space import FIN_SPACE
 from lextract.wordnet.fin import Wordnet as WordnetFin
-from typing import Dict, List, Set
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+FINNPOS_BATCH_SIZE = 256
 
 
 def _fin_token_conf_net(l):
@@ -29,33 +34,86 @@ def _fin_token_conf_net(l):
     return paths
 
 
-def mk_fin_token_auto():
-    return mk_token_auto(
-        (
-            (l, wns, _fin_token_conf_net(l))
-            for l, wns in WordnetFin.lemma_names().items()
-            if not has_abbrv(l)
-        )
+def mk_fin_token_auto(path: Optional[str] = None):
+    return load_or_build_auto(
+        path,
+        lambda: mk_token_auto(
+            (
+                (l, wns, _fin_token_conf_net(l))
+                for l, wns in WordnetFin.lemma_names().items()
+                if not has_abbrv(l)
+            )
+        ),
     )
 
 
 class FinExtractor:
     def __init__(self) -> None:
-        self.tok_auto = mk_fin_token_auto()
+        self.tok_auto = mk_fin_token_auto(auto_cache_path("fin_token"))
+        self.finnpos: Optional[FinnPOS] = None
+        self.finnpos_pid = os.getpid()
+        self.finnpos_lock = threading.Lock()
+
+    def tag_sents(self, sents: List[List[str]]):
+        """
+        Tag a batch of sentences with one round trip through this extractor's
+        FinnPOS process. Sentences are written from another thread so that
+        FinnPOS never blocks on a full output pipe while we are still writing.
+        """
+        # FinnPOS gives nothing back for an empty sentence, so skip them
+        nonempty = [sent for sent in sents if sent]
+        if self.finnpos_pid != os.getpid():
+            # Start our own FinnPOS in forked children rather than sharing the
+            # parent's pipes. The inherited lock may also have been held.
+            self.finnpos = None
+            self.finnpos_pid = os.getpid()
+            self.finnpos_lock = threading.Lock()
+        with self.finnpos_lock:
+            if self.finnpos is None:
+                self.finnpos = FinnPOS()
+            finnpos = self.finnpos
+
+            def feed():
+                for sent in nonempty:
+                    finnpos.feed_sent(sent)
+
+            feeder = threading.Thread(target=feed)
+            feeder.start()
+            tagged = [finnpos.get_analys() for _ in nonempty]
+            feeder.join()
+        tagged_iter = iter(tagged)
+        return [next(tagged_iter) if sent else [] for sent in sents]
 
-    def extract(self, line: str) -> TokenizedTagging:
+    def tokenise(self, line: str) -> Tuple[List[str], List[int]]:
         omorfi = get_omorfi()
         omor_toks = omorfi.tokenise(line)
         starts = get_token_positions(omor_toks, line)
-        return self.extract_toks([tok["surf"] for tok in omor_toks], starts)
+        return [tok["surf"] for tok in omor_toks], starts
 
-    def extract_toks(self, surfs: List[str], starts: List[int]):
-        self.finnpos_analys = sent_finnpos(surfs)
-        tagging = TokenizedTagging(WordnetFin)
+    def extract(self, line: str, light: bool = False) -> TokenizedTagging:
+        return self.extract_toks(*self.tokenise(line), light=light)
+
+    def extract_many(
+        self,
+        lines: Iterable[str],
+        batch_size: int = FINNPOS_BATCH_SIZE,
+        light: bool = False,
+    ) -> Iterator[TokenizedTagging]:
+        for batch in chunked(lines, batch_size):
+            tokenised = [self.tokenise(line) for line in batch]
+            finnpos_analyses = self.tag_sents([surfs for surfs, _starts in tokenised])
+            for (surfs, starts), finnpos_analys in zip(tokenised, finnpos_analyses):
+                yield self.extract_toks(surfs, starts, finnpos_analys, light)
+
+    def conf_net(self, surfs: List[str], finnpos_analys):
+        """
+        Returns the confusion network of lemma choices for each token, which
+        lemmatiser suggested each choice and the FinnPOS features per token.
+        """
         conf_net = []
         sources = []
         feats = []
-        for token, (_fp_surf, fp_lemma, fp_feats) in zip(surfs, self.finnpos_analys):
+        for token, (_fp_surf, fp_lemma, fp_feats) in zip(surfs, finnpos_analys):
             omor = extract_lemmas(token)
             recurs = extract_lemmas_recurs(token)
             tok_sources: Dict[str, List[str]] = {}
@@ -73,6 +131,23 @@ class FinExtractor:
             sources.append(tok_sources)
             feats.append(fp_feats)
             conf_net.append(tok_choices)
+        return conf_net, sources, feats
+
+    def extract_toks(
+        self,
+        surfs: List[str],
+        starts: List[int],
+        finnpos_analys=None,
+        light: bool = False,
+    ):
+        """
+        Tag a tokenised sentence. If `light` is set, the tags are
+        `LightTaggedLemma`s, which only refer to the NLTK lemmas they are for.
+        """
+        if finnpos_analys is None:
+            finnpos_analys = self.tag_sents([surfs])[0]
+        tagging = TokenizedTagging(WordnetFin)
+        conf_net, sources, feats = self.conf_net(surfs, finnpos_analys)
         extract_tokenized_iter(
             tagging,
             conf_net_search(self.tok_auto, conf_net, lambda x: (x[0], x[1][0])),
@@ -82,5 +157,6 @@ class FinExtractor:
             "fi-tok",
             sources,
             feats,
+            light,
         )
         return tagging
@@ -2,24 +2,114 @@ from lextract.aho_corasick.models import (
     UntokenizedTagging,
     TokenizedTagging,
     Anchor,
+    AnyTaggedLemma,
+    LemmaRef,
+    LightTaggedLemma,
     TaggedLemma,
 )
 from lextract.wordnet import ExtractableWordnet, objify_lemmas
+from lextract.wordnet.utils import synset_key_lemmas
 from ahocorasick import Automaton
+from functools import lru_cache
+from nltk.corpus.reader import Lemma
 from typing import Dict, Type, Iterator, Tuple, List
 
+SYNSET_GROUP_CACHE_SIZE = 65536
+
+# A hashable version of the WordNet -> lemma names map of a payload
+PayloadKey = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+_lemma_refs: Dict[LemmaRef, LemmaRef] = {}
+
+
+def intern_lemma_ref(wn: str, lemma_obj: Lemma) -> LemmaRef:
+    ref = (wn, lemma_obj.synset().name(), lemma_obj.name())
+    return _lemma_refs.setdefault(ref, ref)
+
+
+def _payload_key(wn_to_lemma: Dict[str, List[str]]) -> PayloadKey:
+    return tuple((wn, tuple(lemmas)) for wn, lemmas in wn_to_lemma.items())
+
+
+@lru_cache(maxsize=SYNSET_GROUP_CACHE_SIZE)
+def _cached_synset_groups(
+    wordnet: Type[ExtractableWordnet], wn_lemmas: PayloadKey
+) -> Tuple[List[Tuple[str, Lemma]], ...]:
+    return tuple(
+        wordnet.synset_group_lemmas(
+            objify_lemmas({wn: list(lemmas) for wn, lemmas in wn_lemmas})
+        )
+    )
+
+
+def synset_groups(
+    wordnet: Type[ExtractableWordnet], wn_to_lemma: Dict[str, List[str]]
+) -> List[List[Tuple[str, Lemma]]]:
+    """
+    Group the lemmas of an automaton payload by synset. The WordNet lookups
+    are only done the first time a payload is seen.
+    """
+    groups = _cached_synset_groups(wordnet, _payload_key(wn_to_lemma))
+    # Copied since the groups end up as the mutable lemma_objs of tags
+    return [list(group) for group in groups]
+
+
+@lru_cache(maxsize=SYNSET_GROUP_CACHE_SIZE)
+def _cached_synset_refs(
+    wordnet: Type[ExtractableWordnet], wn_lemmas: PayloadKey
+) -> Tuple[Tuple[str, Tuple[LemmaRef, ...]], ...]:
+    grouped = synset_key_lemmas(
+        objify_lemmas({wn: list(lemmas) for wn, lemmas in wn_lemmas}), wordnet
+    )
+    return tuple(
+        (synset_id, tuple(intern_lemma_ref(wn, lemma_obj) for wn, lemma_obj in group))
+        for synset_id, group in grouped.items()
+    )
+
+
+def synset_refs(
+    wordnet: Type[ExtractableWordnet], wn_to_lemma: Dict[str, List[str]]
+) -> Tuple[Tuple[str, Tuple[LemmaRef, ...]], ...]:
+    """
+    As `synset_groups`, but gives pairs of the canonical synset id and
+    references to the lemmas rather than keeping the NLTK objects around.
+    """
+    return _cached_synset_refs(wordnet, _payload_key(wn_to_lemma))
+
+
+def payload_tags(
+    wordnet: Type[ExtractableWordnet],
+    lemma: str,
+    wn_to_lemma: Dict[str, List[str]],
+    light: bool = False,
+) -> List[AnyTaggedLemma]:
+    """
+    Make a tag for each synset of an automaton payload. If `light` is set,
+    these are `LightTaggedLemma`s rather than `TaggedLemma`s.
+    """
+    if light:
+        return [
+            LightTaggedLemma(lemma, synset_id, lemma_refs)
+            for synset_id, lemma_refs in synset_refs(wordnet, wn_to_lemma)
+        ]
+    tags: List[AnyTaggedLemma] = []
+    for group in synset_groups(wordnet, wn_to_lemma):
+        tag_group = TaggedLemma(lemma)
+        tag_group.lemma_objs = group
+        tags.append(tag_group)
+    return tags
+
 
 def extract_auto(
-    line: str, wn: Type[ExtractableWordnet], auto: Automaton, from_id: str
+    line: str,
+    wn: Type[ExtractableWordnet],
+    auto: Automaton,
+    from_id: str,
+    light: bool = False,
 ) -> UntokenizedTagging:
     tagging = UntokenizedTagging(wn)
     for tok_idx, (end_pos, (token, wn_to_lemma)) in enumerate(auto.iter(line)):
-        groups = wn.synset_group_lemmas(objify_lemmas(wn_to_lemma))
-        tags = []
-        for group in groups:
-            tag_group = TaggedLemma(token)
-            tag_group.lemma_objs = group
-            tags.append(tag_group)
+        tags = payload_tags(wn, token, wn_to_lemma, light)
         tagging.add_tags(token, [Anchor(from_id, end_pos - len(token) + 1)], tags)
     return tagging
 
@@ -40,14 +130,12 @@ def extract_tokenized_iter(
     from_id: str,
     sources=None,
     feats=None,
+    light: bool = False,
 ):
     for end_pos, (lf_tokens, wn_to_lemma) in iter:
         start_pos = end_pos - len(lf_tokens) + 1
-        groups = wordnet.synset_group_lemmas(objify_lemmas(wn_to_lemma))
-        tags = []
-        for group in groups:
-            tag_group = TaggedLemma(" ".join(lf_tokens))
-            tag_group.lemma_objs = group
+        tags = payload_tags(wordnet, " ".join(lf_tokens), wn_to_lemma, light)
+        for tag_group in tags:
             if sources and feats:
                 tag_group.lemma_path = " ".join(
                     ",".join(sources[tok_idx][lemma])
@@ -56,7 +144,6 @@ def extract_tokenized_iter(
                 tag_group.finnpos_feats = feats[start_pos : end_pos + 1]
             else:
                 tag_group.lemma_path = "whole"
-            tags.append(tag_group)
         tagging.add_tags(
             " ".join(surfs[start_pos : end_pos + 1]),
             [Anchor(from_id, starts[start_pos], start_pos, len(lf_tokens))],
@@ -65,10 +152,16 @@ def extract_tokenized_iter(
 
 
 def extract_tokenized(
-    line: str, wn: Type[ExtractableWordnet], auto: Automaton, id: str
+    line: str,
+    wn: Type[ExtractableWordnet],
+    auto: Automaton,
+    id: str,
+    light: bool = False,
 ) -> TokenizedTagging:
     tagging = TokenizedTagging(wn)
     tokens = line.split(" ")
     starts = list(get_tokens_starts(tokens))
-    extract_tokenized_iter(tagging, auto.iter(tokens), wn, tokens, starts, id)
+    extract_tokenized_iter(
+        tagging, auto.iter(tokens), wn, tokens, starts, id, light=light
+    )
     return tagging
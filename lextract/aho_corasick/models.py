@@ -10,6 +10,7 @@ from typing import (
     Set,
     Type,
     TYPE_CHECKING,
+    Union,
 )
 from urllib.parse import urlencode
 
@@ -17,6 +18,8 @@ if TYPE_CHECKING:
     from lextract.wordnet.base import ExtractableWordnet  # noqa: F401
 
 
+# A reference to a WordNet lemma: (wordnet, synset name, lemma name)
+LemmaRef = Tuple[str, str, str]
 CrossToksMatcher = Callable[["Anchor", "Anchor"], bool]
 Matcher = Callable[["Token", "Token"], bool]
 Combiner = Callable[["Token", "Token"], None]
@@ -117,12 +120,104 @@ class TaggedLemma:
             return False
         return self.lemma == other.lemma and self.lemma_objs == other.lemma_objs
 
+    def __getstate__(self):
+        # Lemma objects reference their whole WordNet reader, so pickle
+        # references to them instead
+        state = self.__dict__.copy()
+        state["lemma_objs"] = [
+            (wn, lemma_obj.synset().name(), lemma_obj.name())
+            for wn, lemma_obj in self.lemma_objs
+        ]
+        return state
+
+    def __setstate__(self, state):
+        from lextract.wordnet import lemma_by_ref
+
+        state["lemma_objs"] = [
+            (wn, lemma_by_ref(wn, synset_name, lemma_name))
+            for wn, synset_name, lemma_name in state["lemma_objs"]
+        ]
+        self.__dict__.update(state)
+
+
+@dataclass
+class LightTaggedLemma:
+    """
+    As TaggedLemma, but only holding the canonical synset id and interned
+    references to the lemmas, so that it is cheap to build and pickle. The
+    NLTK Lemma objects are only looked up if `lemma_objs` is accessed.
+    """
+
+    lemma: str
+    synset_id: str
+    lemma_refs: Tuple[LemmaRef, ...] = ()
+    id: Optional[int] = None
+    supports: List[TagSupport] = field(default_factory=list)
+    rank: Optional[Tuple[int, int]] = None
+    lemma_path: str = "whole"
+    finnpos_feats: List[Dict[str, str]] = field(default_factory=list)
+
+    @property
+    def lemma_objs(self) -> List[Tuple[str, Lemma]]:
+        lemma_objs = self.__dict__.get("_lemma_objs")
+        if lemma_objs is None:
+            from lextract.wordnet import lemma_by_ref
+
+            lemma_objs = [
+                (wn, lemma_by_ref(wn, synset_name, lemma_name))
+                for wn, synset_name, lemma_name in self.lemma_refs
+            ]
+            self.__dict__["_lemma_objs"] = lemma_objs
+        return lemma_objs
+
+    @property
+    def wordnets(self) -> List[str]:
+        return [wn for (wn, _synset_name, _lemma_name) in self.lemma_refs]
+
+    @property
+    def lemma_names(self) -> Set[str]:
+        return set((lemma_name for (_wn, _synset_name, lemma_name) in self.lemma_refs))
+
+    @property
+    def lemma_names_url(self) -> str:
+        d = {}  # type: Dict[str, List[str]]
+        for (wn, _synset_name, lemma_name) in self.lemma_refs:
+            d.setdefault(lemma_name, []).append(wn)
+        return " ".join(
+            "l={}&wn={}".format(lemma_name, ",".join(wns))
+            for lemma_name, wns in d.items()
+        )
+
+    @property
+    def synset_names(self) -> Set[str]:
+        return set((synset_name for (_wn, synset_name, _lemma_name) in self.lemma_refs))
+
+    @property
+    def wn_synset_names(self) -> List[Tuple[str, str]]:
+        return [(wn, synset_name) for (wn, synset_name, _lemma_name) in self.lemma_refs]
+
+    def canonical_synset_id(self, wordnet: Type["ExtractableWordnet"]):
+        return self.synset_id
+
+    def __eq__(self, other: object):
+        if not isinstance(other, LightTaggedLemma):
+            return False
+        return self.lemma == other.lemma and self.lemma_refs == other.lemma_refs
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_lemma_objs", None)
+        return state
+
+
+AnyTaggedLemma = Union[TaggedLemma, LightTaggedLemma]
+
 
 @dataclass
 class Token:
     token: str
     anchors: List[Anchor]
-    tags: List[TaggedLemma]
+    tags: List[AnyTaggedLemma]
 
 
 class Tagging:
@@ -142,7 +237,7 @@ class Tagging:
             for tok_idx, tok in enumerate(self.tokens):
                 self._index_tags(tok_idx, tok.tags)
 
-    def _index_tags(self, tok_idx: int, tags: List[TaggedLemma]):
+    def _index_tags(self, tok_idx: int, tags: List[AnyTaggedLemma]):
         for tag in tags:
             self.wnsynsets.setdefault(tag.canonical_synset_id(self.wordnet), []).append(
                 tok_idx
@@ -157,13 +252,15 @@ class Tagging:
                 for wn, lemma_obj in tag.lemma_objs:
                     yield wn, lemma_obj
 
-    def add_tags(self, token: str, anchors: List[Anchor], tags: List[TaggedLemma]):
+    def add_tags(
+        self, token: str, anchors: List[Anchor], tags: List[AnyTaggedLemma]
+    ):
         tok = Token(token, anchors, tags)
         tok_idx = len(self.tokens)
         self.tokens.append(tok)
         self._index_tags(tok_idx, tags)
 
-    def iter_tags(self) -> Iterator[Tuple[Token, TaggedLemma]]:
+    def iter_tags(self) -> Iterator[Tuple[Token, AnyTaggedLemma]]:
         for token in self.tokens:
             for tag in token.tags:
                 yield token, tag
@@ -0,0 +1,56 @@
+import os
+from functools import partial
+from typing import Iterable, Iterator, List, Optional
+
+from more_itertools import chunked
+
+from lextract.utils.parallel import CHUNK_SIZE, imap_bounded
+from .models import Tagging
+
+
+def init_worker(extractor_name: str, parent_pid: int) -> None:
+    from . import _registry, get_extractor
+
+    # An extractor inherited from the parent would share its subprocesses,
+    # e.g. FinnPOS, with the parent and the other workers
+    if os.getpid() != parent_pid:
+        _registry.pop(extractor_name, None)
+    # Build or load the automata before the first chunk arrives
+    get_extractor(extractor_name)
+
+
+def extract_lines(extractor_name: str, light: bool, lines: List[str]) -> List[Tagging]:
+    from . import get_extractor
+
+    extractor = get_extractor(extractor_name)
+    if hasattr(extractor, "extract_many"):
+        return list(extractor.extract_many(lines, light=light))
+    return [extractor.extract(line, light=light) for line in lines]
+
+
+def extract_corpus(
+    lines: Iterable[str],
+    extractor_name: str = "FinExtractor",
+    jobs: int = 1,
+    chunk_size: int = CHUNK_SIZE,
+    max_pending: Optional[int] = None,
+    light: bool = False,
+) -> Iterator[Tagging]:
+    """
+    Tag each of `lines` with the extractor registered as `extractor_name`
+    using a pool of `jobs` worker processes. Taggings are yielded in input
+    order. At most `max_pending` chunks of `chunk_size` lines are in flight
+    at once. Set AUTO_CACHE_DIR to have workers load their automata rather
+    than each building them. Pass `light` to get taggings made of
+    `LightTaggedLemma`s, which are much cheaper to send back from the workers.
+    """
+    for taggings in imap_bounded(
+        partial(extract_lines, extractor_name, light),
+        chunked(lines, chunk_size),
+        jobs,
+        chunk_size=1,
+        max_pending=max_pending,
+        initializer=init_worker,
+        initargs=(extractor_name, os.getpid()),
+    ):
+        yield from taggings
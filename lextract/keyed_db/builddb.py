@@ -4,59 +4,100 @@ import logging
 from enum import Enum
 from operator import itemgetter
 from collections import Counter
-from typing import List, Tuple, Optional, Dict
+from functools import partial
+from typing import Any, FrozenSet, List, Tuple, Optional, Dict, Set
 
 import click_log
 import click
 from itertools import groupby
-from wordfreq import word_frequency
+from more_itertools import chunked
 
 from lextract.mweproc.consts import SURF, WILDCARD
 from lextract.mweproc.db.queries import mwe_for_indexing
+from lextract.keyed_db.queries import (
+    all_key2_lemmas_query,
+    orphaned_word_ids_query,
+    unindexed_mwe_for_indexing,
+    word_keys_query,
+)
+from lextract.keyed_db.freqs import CorpusFreqs, wordfreq_fi
 from lextract.keyed_db.tables import tables, extend_mweproc
 from lextract.utils.lemmatise import fi_lemmatise
-from wikiparse.utils.db import get_session, insert, insert_get_id
+from lextract.utils.db import BulkInserter, SessionInserter, has_table
+from lextract.utils.parallel import imap_bounded
+from wikiparse.utils.db import get_session
 
 logger = logging.getLogger(__name__)
 click_log.basic_config(logger)
 
+INSERT_BATCH_SIZE = 10000
+DELETE_BATCH_SIZE = 500
 
-def get_key_idx(subwords):
+_worker_freq: Any = wordfreq_fi
+
+
+SubwordsList = List[Tuple[Optional[str], bool, List[str], Dict[str, str]]]
+SubwordKeys = List[Dict[str, Set[Tuple[Tuple[str, str], ...]]]]
+# ud_mwe_id -> (word_id, key_idx, key_is_head, key2_lemmas)
+WordKeys = Dict[int, Tuple[int, int, bool, Optional[FrozenSet[str]]]]
+
+
+def get_key_idx(subword_keys: SubwordKeys, freq=wordfreq_fi) -> int:
+    """
+    Returns the index of the subword with the lowest total `freq` over all
+    its key lemmas, which is the one which will have the fewest candidates
+    at extraction time.
+    """
     key_idx = 0
-    min_freq = 1
-    for idx, (_payload, _payload_is_lemma, _poses, feats) in enumerate(subwords):
-        skip = False
-        total_freq = 0
-        for subword_lemma in feats.keys():
-            if subword_lemma == WILDCARD:
-                skip = True
-                break
-            total_freq += word_frequency(subword_lemma, "fi")
-        if skip:
+    min_freq = float("inf")
+    for idx, keyed_feats in enumerate(subword_keys):
+        if not keyed_feats or WILDCARD in keyed_feats:
             continue
+        total_freq = sum(freq(subword_lemma) for subword_lemma in keyed_feats)
         if total_freq < min_freq:
             min_freq = total_freq
             key_idx = idx
     return key_idx
 
 
+def get_key2_idx(
+    subword_keys: SubwordKeys, key_idx: int, min_freq: float, freq=wordfreq_fi
+) -> Optional[int]:
+    """
+    Returns the index of the rarest subword other than `key_idx` to use as a
+    second key, or None if the key at `key_idx` is rarer than `min_freq` or
+    there is no other subword with a lemma.
+    """
+    if sum(freq(lemma) for lemma in subword_keys[key_idx]) < min_freq:
+        return None
+    key2_idx = None
+    key2_freq = float("inf")
+    for idx, keyed_feats in enumerate(subword_keys):
+        if idx == key_idx or not keyed_feats or WILDCARD in keyed_feats:
+            continue
+        total_freq = sum(freq(subword_lemma) for subword_lemma in keyed_feats)
+        if total_freq < key2_freq:
+            key2_freq = total_freq
+            key2_idx = idx
+    return key2_idx
+
+
 class IndexingResult(Enum):
     HEAD_INDEXED = enum.auto()
     RAREST_INDEXED = enum.auto()
     FAIL = enum.auto()
+    UNCHANGED = enum.auto()
 
 
-def insert_indexed(
-    session,
-    subwords_list: List[Tuple[Optional[str], bool, List[str], Dict[str, str]]],
+def key_subwords(
+    subwords_list: SubwordsList,
     ud_mwe_headword_idx,
-    ud_mwe_id,
     *,
     ignore_bare_lemma=True,
     lemmatise=fi_lemmatise,
-    dry_run=False,
     add_surf=True,
-) -> IndexingResult:
+    freq=wordfreq_fi,
+) -> Tuple[int, bool, SubwordKeys]:
     subword_keys = []
     for (payload, payload_is_lemma, poses, feats) in subwords_list:
         bare_lemma = payload_is_lemma and len(feats) == 0 and not ignore_bare_lemma
@@ -77,30 +118,41 @@ def insert_indexed(
         key_idx = ud_mwe_headword_idx
         key_is_head = True
     else:
-        key_idx = get_key_idx(subwords_list)
+        key_idx = get_key_idx(subword_keys, freq)
         key_is_head = False
     assert key_idx is not None
+    return key_idx, key_is_head, subword_keys
+
+
+def insert_keyed(
+    inserter,
+    ud_mwe_id,
+    key_idx: int,
+    key_is_head: bool,
+    subword_keys: SubwordKeys,
+    dry_run=False,
+    key2_idx: Optional[int] = None,
+) -> IndexingResult:
     key_lemmas = list(subword_keys[key_idx].keys())
     if not len(key_lemmas):
         return IndexingResult.FAIL
     if not dry_run:
-        word_id = insert_get_id(
-            session,
+        word_id = inserter.insert_get_id(
             tables["word"],
             key_idx=key_idx,
             key_is_head=key_is_head,
             ud_mwe_id=ud_mwe_id,
         )
-    for lemma in key_lemmas:
-        if not dry_run:
-            insert(
-                session, tables["key_lemma"], key_lemma=lemma, word_id=word_id,
-            )
-    for subword_idx, constrained_lemmas in enumerate(subword_keys):
-        lemma_feats = {k: list(v) for k, v in constrained_lemmas.items()}
-        if not dry_run:
-            insert(
-                session,
+        for lemma in key_lemmas:
+            inserter.insert(tables["key_lemma"], key_lemma=lemma, word_id=word_id)
+        if key2_idx is not None:
+            for lemma in subword_keys[key2_idx]:
+                inserter.insert(
+                    tables["key2_lemma"], key2_lemma=lemma, word_id=word_id
+                )
+        for subword_idx, constrained_lemmas in enumerate(subword_keys):
+            lemma_feats = {k: list(v) for k, v in constrained_lemmas.items()}
+            inserter.insert(
                 tables["subword"],
                 word_id=word_id,
                 subword_idx=subword_idx,
@@ -112,40 +164,225 @@ def insert_indexed(
         return IndexingResult.RAREST_INDEXED
 
 
+def insert_indexed(
+    session,
+    subwords_list: SubwordsList,
+    ud_mwe_headword_idx,
+    ud_mwe_id,
+    *,
+    ignore_bare_lemma=True,
+    lemmatise=fi_lemmatise,
+    dry_run=False,
+    add_surf=True,
+    inserter=None,
+) -> IndexingResult:
+    if inserter is None:
+        inserter = SessionInserter(session)
+    return insert_keyed(
+        inserter,
+        ud_mwe_id,
+        *key_subwords(
+            subwords_list,
+            ud_mwe_headword_idx,
+            ignore_bare_lemma=ignore_bare_lemma,
+            lemmatise=lemmatise,
+            add_surf=add_surf,
+        ),
+        dry_run=dry_run,
+    )
+
+
+def iter_mwe_groups(mwe_it):
+    for (ud_mwe_id, ud_mwe_headword_idx), subwords in groupby(mwe_it, itemgetter(0, 1)):
+        yield ud_mwe_id, ud_mwe_headword_idx, [tuple(tpl[2:]) for tpl in subwords]
+
+
+def init_key_worker(freq) -> None:
+    global _worker_freq
+    _worker_freq = freq
+
+
+def key_mwe_group(ignore_bare_lemma, add_surf, key2_min_freq, group):
+    freq = _worker_freq
+    ud_mwe_id, ud_mwe_headword_idx, subwords_list = group
+    key_idx, key_is_head, subword_keys = key_subwords(
+        subwords_list,
+        ud_mwe_headword_idx,
+        ignore_bare_lemma=ignore_bare_lemma,
+        add_surf=add_surf,
+        freq=freq,
+    )
+    key2_idx = None
+    if key2_min_freq is not None:
+        key2_idx = get_key2_idx(subword_keys, key_idx, key2_min_freq, freq)
+    return ud_mwe_id, key_idx, key_is_head, subword_keys, key2_idx
+
+
+def delete_words(session, word_ids: List[int]):
+    for batch in chunked(word_ids, DELETE_BATCH_SIZE):
+        for table in (tables["subword"], tables["key_lemma"], tables["key2_lemma"]):
+            session.execute(table.delete().where(table.c.word_id.in_(batch)))
+        session.execute(tables["word"].delete().where(tables["word"].c.id.in_(batch)))
+
+
+def load_word_keys(session) -> WordKeys:
+    key2_lemmas: Dict[int, Set[str]] = {}
+    if has_table(session, tables["key2_lemma"]):
+        for key2_lemma, word_id in session.execute(all_key2_lemmas_query()):
+            key2_lemmas.setdefault(word_id, set()).add(key2_lemma)
+    return {
+        ud_mwe_id: (
+            word_id,
+            key_idx,
+            key_is_head,
+            frozenset(key2_lemmas[word_id]) if word_id in key2_lemmas else None,
+        )
+        for ud_mwe_id, word_id, key_idx, key_is_head in session.execute(
+            word_keys_query()
+        )
+    }
+
+
 def add_keyed_words(
     session,
     mwe_it,
     ignore_bare_lemma: bool = True,
     add_surf: bool = True,
     dry_run: bool = False,
+    jobs: int = 1,
+    word_keys: Optional[WordKeys] = None,
+    freq=wordfreq_fi,
+    key2_min_freq: Optional[float] = None,
 ):
-    for (ud_mwe_id, ud_mwe_headword_idx), subwords in groupby(mwe_it, itemgetter(0, 1)):
-        subwords_list = list((tpl[2:] for tpl in subwords))
-        yield insert_indexed(
-            session,
-            subwords_list,
-            ud_mwe_headword_idx,
+    """
+    Index each MWE from `mwe_it`, yielding an `IndexingResult` for each. Keys
+    are computed in `jobs` worker processes while rows are buffered and
+    written in bulk every `INSERT_BATCH_SIZE` MWEs and once `mwe_it` is
+    exhausted.
+
+    If `word_keys`, as returned by `load_word_keys`, is given, MWEs which are
+    already indexed are re-keyed only if their key or second key has changed.
+
+    Non-head keys are chosen as the rarest according to `freq`, which may be
+    a `CorpusFreqs`. If `key2_min_freq` is given, MWEs with keys at least
+    that frequent are also given a second key, so that they are only tried
+    on sentences containing both.
+    """
+    inserter = BulkInserter(session)
+    stale: List[int] = []
+
+    def flush():
+        # Old rows must go before their replacements, which reuse ud_mwe_id
+        delete_words(session, stale)
+        stale.clear()
+        inserter.flush()
+
+    keyed_it = imap_bounded(
+        partial(key_mwe_group, ignore_bare_lemma, add_surf, key2_min_freq),
+        iter_mwe_groups(mwe_it),
+        jobs,
+        # Sent once per worker rather than pickled with every chunk
+        initializer=init_key_worker,
+        initargs=(freq,),
+    )
+    for idx, (ud_mwe_id, key_idx, key_is_head, subword_keys, key2_idx) in enumerate(
+        keyed_it
+    ):
+        if word_keys is not None and ud_mwe_id in word_keys:
+            key2_lemmas = None
+            if key2_idx is not None:
+                key2_lemmas = frozenset(subword_keys[key2_idx])
+            word_id, old_key_idx, old_key_is_head, old_key2_lemmas = word_keys[
+                ud_mwe_id
+            ]
+            if (
+                old_key_idx == key_idx
+                and old_key_is_head == key_is_head
+                and old_key2_lemmas == key2_lemmas
+            ):
+                yield IndexingResult.UNCHANGED
+                continue
+            if not dry_run:
+                stale.append(word_id)
+        yield insert_keyed(
+            inserter,
             ud_mwe_id,
-            ignore_bare_lemma=ignore_bare_lemma,
-            add_surf=add_surf,
+            key_idx,
+            key_is_head,
+            subword_keys,
             dry_run=dry_run,
+            key2_idx=key2_idx,
         )
+        if (idx + 1) % INSERT_BATCH_SIZE == 0:
+            flush()
+    flush()
 
 
 @click.command("add-keyed-words")
 @click.option("--ignore-bare-lemma/--use-bare-lemma", default=True)
 @click.option("--add-surf/--no-add-surf", default=True)
 @click.option("--dry-run", is_flag=True)
+@click.option("--jobs", default=1, help="Number of worker processes to compute keys in")
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only index MWEs which are not yet indexed and remove deleted ones",
+)
+@click.option(
+    "--rekey",
+    is_flag=True,
+    help="Like --incremental, but also re-index MWEs whose key has changed",
+)
+@click.option(
+    "--freqs",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Key lemma frequencies from count-key-lemmas to choose keys with",
+)
+@click.option(
+    "--key2-min-freq",
+    type=float,
+    help="Give MWEs whose key is at least this frequent a second key",
+)
 @click_log.simple_verbosity_option(logger)
-def add_keyed_words_cmd(ignore_bare_lemma: bool, add_surf: bool, dry_run: bool):
+def add_keyed_words_cmd(
+    ignore_bare_lemma: bool,
+    add_surf: bool,
+    dry_run: bool,
+    jobs: int,
+    incremental: bool,
+    rekey: bool,
+    freqs: Optional[str],
+    key2_min_freq: Optional[float],
+):
     """
     Index multiwords/inflections/frames into database
     """
     session = get_session()
     metadata = extend_mweproc()
+    engine = session().get_bind().engine
     if not dry_run:
-        metadata.create_all(session().get_bind().engine)
-    inner_it = session.execute(mwe_for_indexing())
+        metadata.create_all(engine)
+    journal_mode = None
+    if engine.dialect.name == "sqlite" and not dry_run:
+        # Words are deleted and re-inserted in an index which is in use, and
+        # the MWEs share the file, so a crash must be able to roll back
+        journal_mode = session.execute("PRAGMA journal_mode;").scalar()
+        session.execute("PRAGMA journal_mode = WAL;")
+        session.execute("PRAGMA synchronous = NORMAL;")
+    freq = wordfreq_fi if freqs is None else CorpusFreqs.load(freqs)
+    word_keys = None
+    if incremental or rekey:
+        orphans = [word_id for (word_id,) in session.execute(orphaned_word_ids_query())]
+        logger.info("Removing %s words of deleted MWEs", len(orphans))
+        if not dry_run:
+            delete_words(session, orphans)
+    if rekey:
+        word_keys = load_word_keys(session)
+        inner_it = session.execute(mwe_for_indexing())
+    elif incremental:
+        inner_it = session.execute(unindexed_mwe_for_indexing())
+    else:
+        inner_it = session.execute(mwe_for_indexing())
     if logger.isEnabledFor(logging.INFO):
         ctx = contextlib.nullcontext(inner_it)
     else:
@@ -153,14 +390,26 @@ def add_keyed_words_cmd(ignore_bare_lemma: bool, add_surf: bool, dry_run: bool):
     cnt: Counter = Counter()
     with ctx as outer_it:
         for indexing_result in add_keyed_words(
-            session, outer_it, ignore_bare_lemma, add_surf, dry_run
+            session,
+            outer_it,
+            ignore_bare_lemma,
+            add_surf,
+            dry_run,
+            jobs,
+            word_keys,
+            freq,
+            key2_min_freq,
         ):
             if indexing_result == IndexingResult.HEAD_INDEXED:
                 cnt["headword_idxd"] += 1
             elif indexing_result == IndexingResult.RAREST_INDEXED:
                 cnt["rarest_idxd"] += 1
+            elif indexing_result == IndexingResult.UNCHANGED:
+                cnt["unchanged"] += 1
             else:
                 cnt["fail_idxd"] += 1
 
     if not dry_run:
         session.commit()
+    if journal_mode is not None:
+        session.execute(f"PRAGMA journal_mode = {journal_mode};")
@@ -2,7 +2,8 @@ import click
 from wikiparse.cmd.mk_db import mk_cmds
 
 from lextract.keyed_db.builddb import add_keyed_words_cmd
-from lextract.keyed_db.repl import extract_toks_cmd
+from lextract.keyed_db.freqs import count_key_lemmas_cmd, key_fanout_cmd
+from lextract.keyed_db.repl import extract_conllu_cmd, extract_toks_cmd
 
 
 def mk_metadata():
@@ -17,7 +18,10 @@ merged = click.CommandCollection(
         click.Group(
             commands={
                 "add-keyed-words": add_keyed_words_cmd,
+                "count-key-lemmas": count_key_lemmas_cmd,
+                "key-fanout": key_fanout_cmd,
                 "extract-toks": extract_toks_cmd,
+                "extract-conllu": extract_conllu_cmd,
             }
         ),
     ],
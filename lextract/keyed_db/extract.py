@@ -1,61 +1,96 @@
-from typing import Dict, List
-from boltons.dictutils import FrozenDict
+import enum
+import logging
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 from more_itertools import chunked
 
 from ..mweproc.consts import WILDCARD
 from ..utils.lemmatise import fi_lemmatise
-from .utils import frozendict_append, frozendict_order_insert
+from .utils import (
+    Matching,
+    empty_matching,
+    frozendict_append,
+    frozendict_order_insert,
+    matching_add,
+    matching_set,
+    matching_to_frozendict,
+    matching_union,
+)
 from lextract.keyed_db.tables import tables
+from lextract.utils.db import has_table
 from .queries import key_lemmas_query, word_subwords_query
+from .index import KeyedMatcherIndex, add_word_subword_row, group_key_lemma_rows
+from .feats import any_subset, compile_lemma_feats
 
 
+logger = logging.getLogger(__name__)
+
 LEMMAS_CHUNK_SIZE = 256
+BATCH_WINDOW = 1024
+# Default budget of the command line and service. The library is unbounded.
+DEP_MAX_STATES = 100000
 
 
 def get_matchers(conn, all_lemmas):
-    word_t = tables["word"]
-    subword_t = tables["subword"]
-    key_lemma_t = tables["key_lemma"]
-    query = key_lemmas_query()
-    lemma_key_rows = conn.execute(query, params={"key_lemmas": list(all_lemmas)})
-    key_lemmas = {}
-    word_ids = []
-    for row in lemma_key_rows:
-        word_id = row[tables["word"].c.id]
-        if word_id not in word_ids:
-            word_ids.append(word_id)
-        key_lemmas.setdefault(row[key_lemma_t.c.key_lemma], []).append(word_id)
-    words = {}
-    word_subword_rows = conn.execute(
-        word_subwords_query(), params={"word_ids": word_ids}
+    """
+    Get the words keyed by any of `all_lemmas`, bucketed by key lemma and
+    then second key lemma, or None for no second key. `conn` can either be a
+    database connection or a `KeyedMatcherIndex`.
+    """
+    if isinstance(conn, KeyedMatcherIndex):
+        return conn.get_matchers(all_lemmas)
+    query = key_lemmas_query(has_table(conn, tables["key2_lemma"]))
+    key_lemmas = group_key_lemma_rows(
+        conn.execute(query, {"key_lemmas": list(all_lemmas)})
+    )
+    word_ids = list(
+        {
+            word_id: None
+            for buckets in key_lemmas.values()
+            for bucket in buckets.values()
+            for word_id in bucket
+        }
     )
+    words = {}
+    word_subword_rows = conn.execute(word_subwords_query(), {"word_ids": word_ids})
     for row in word_subword_rows:
-        if row[word_t.c.id] not in words:
-            words[row[word_t.c.id]] = {
-                "ud_mwe_id": row[word_t.c.ud_mwe_id],
-                "key_idx": row[word_t.c.key_idx],
-                "key_is_head": row[word_t.c.key_is_head],
-                "subwords": [],
-            }
-        words[row[word_t.c.id]]["subwords"].append(
-            (row[subword_t.c.subword_idx], row[subword_t.c.lemma_feats])
-        )
+        add_word_subword_row(words, row)
     return key_lemmas, words
 
 
-def feats_to_set(feats):
-    if isinstance(feats, (list, tuple)):
-        return {tuple(elem) for elem in feats}
-    else:
-        return set(feats.items())
+def resolve_matchers(conn, lemmas, matcher_cache=None):
+    """
+    Map each of `lemmas` to the words keyed by it. Each lemma is only looked
+    up once. The words for each lemma are bucketed by second key lemma as
+    returned by `get_matchers`. If `matcher_cache` is given, it is consulted
+    before `conn` and updated with the newly resolved lemmas, including those
+    which key no words, so that it can be shared across calls. It may be a
+    bounded cache which evicts entries.
+    """
+    if matcher_cache is None:
+        matcher_cache = {}
+    resolved = {}
+    missing = []
+    for lemma in dict.fromkeys(lemmas):
+        if lemma in matcher_cache:
+            resolved[lemma] = matcher_cache[lemma]
+        else:
+            missing.append(lemma)
+    for lemma_chunk in chunked(missing, LEMMAS_CHUNK_SIZE):
+        key_lemmas, words = get_matchers(conn, lemma_chunk)
+        for lemma in lemma_chunk:
+            resolved[lemma] = matcher_cache[lemma] = {
+                key2_lemma: tuple(words[word_id] for word_id in word_ids)
+                for key2_lemma, word_ids in key_lemmas.get(lemma, {}).items()
+            }
+    return resolved
 
 
-def any_subset(matcher_feats_list, cand_feats_list):
-    for matcher_feat in matcher_feats_list:
-        for cand_feat in cand_feats_list:
-            if feats_to_set(matcher_feat).issubset(feats_to_set(cand_feat)):
-                return True
-    return False
+def union_lemmas(lemma_maps):
+    lemmas = {}
+    for lemma_map in lemma_maps:
+        lemmas.update(dict.fromkeys(lemma_map))
+    return list(lemmas)
 
 
 def index_sentence(surfs):
@@ -83,22 +118,69 @@ def conllu_to_indexed(sent):
     return lemma_map, all_lemma_feats
 
 
-def iter_match_cands(conn, lemma_map, all_lemma_feats):
-    for lemma_chunk in chunked(lemma_map.keys(), LEMMAS_CHUNK_SIZE):
-        key_lemmas, words = get_matchers(conn, lemma_chunk)
-        # Matched lemma
-        for key_lemma, word_ids in key_lemmas.items():
-            # Potential matched word
-            for word_id in word_ids:
-                word = words[word_id]
-                # Anchor point for match
-                for lemma_idx in lemma_map[key_lemma]:
-                    # Check feats on key lemma
-                    matcher_feats = key_matcher_feats(word, key_lemma)
-                    cand_feats = all_lemma_feats[lemma_idx][key_lemma]
-                    if not any_subset(matcher_feats, cand_feats):
-                        continue
-                    yield lemma_idx, key_lemma, word
+def compile_sent_feats(all_lemma_feats):
+    return [compile_lemma_feats(lemma_feats) for lemma_feats in all_lemma_feats]
+
+
+def iter_match_cands(conn, lemma_map, all_lemma_feats, matcher_cache=None):
+    matchers = resolve_matchers(conn, lemma_map.keys(), matcher_cache)
+    sent_lemmas = lemma_map.keys()
+    # Matched lemma
+    for key_lemma, buckets in matchers.items():
+        if not buckets:
+            continue
+        key_cands = [
+            (lemma_idx, all_lemma_feats[lemma_idx][key_lemma])
+            for lemma_idx in lemma_map[key_lemma]
+        ]
+        # Many words keyed by the same lemma share the same feats on it
+        anchors_by_feats: Dict[Tuple[int, ...], List[int]] = {}
+        # Potential matched word
+        for word in bucketed_words(buckets, sent_lemmas):
+            if not subword_lemmas_present(word, sent_lemmas):
+                continue
+            matcher_feats = key_matcher_feats(word, key_lemma)
+            # Anchor points for match, checking feats on key lemma
+            anchors = anchors_by_feats.get(matcher_feats)
+            if anchors is None:
+                anchors = [
+                    lemma_idx
+                    for lemma_idx, cand_feats in key_cands
+                    if any_subset(matcher_feats, cand_feats)
+                ]
+                anchors_by_feats[matcher_feats] = anchors
+            for lemma_idx in anchors:
+                yield lemma_idx, key_lemma, word
+
+
+def bucketed_words(buckets, sent_lemmas):
+    """
+    Yield the words of `buckets` without a second key and, once each, those
+    whose second key has one of its lemmas among `sent_lemmas`.
+    """
+    yield from buckets.get(None, ())
+    if len(buckets) == 1 and None in buckets:
+        return
+    seen = set()
+    for lemma in sent_lemmas:
+        for word in buckets.get(lemma, ()):
+            # A second key can have many lemmas in the same sentence
+            if id(word) not in seen:
+                seen.add(id(word))
+                yield word
+
+
+def subword_lemmas_present(word, sent_lemmas) -> bool:
+    """
+    Check that every subword which is not a wildcard has one of its lemmas
+    somewhere in the sentence, without which no match is possible.
+    """
+    for _subword_idx, matcher_lemma_feats in word["subwords"]:
+        if WILDCARD in matcher_lemma_feats:
+            continue
+        if sent_lemmas.isdisjoint(matcher_lemma_feats):
+            return False
+    return True
 
 
 def key_matcher_feats(word, key_lemma):
@@ -129,35 +211,67 @@ def match_any(matcher_lemma_feats, cand_lemma_feats):
     return False, None
 
 
-def extract_toks(conn, surfs: List[str], extend_wildcards=True):
+def extract_toks(conn, surfs: List[str], extend_wildcards=True, matcher_cache=None):
     lemma_map, all_lemma_feats = index_sentence(surfs)
     return extract_toks_indexed(
-        conn, lemma_map, all_lemma_feats, extend_wildcards=extend_wildcards
+        conn,
+        lemma_map,
+        all_lemma_feats,
+        extend_wildcards=extend_wildcards,
+        matcher_cache=matcher_cache,
     )
 
 
+def extract_toks_batch(
+    conn,
+    sentences: Iterable[List[str]],
+    extend_wildcards=True,
+    window=BATCH_WINDOW,
+    matcher_cache=None,
+):
+    """
+    Like `extract_toks` but over many sentences. The matchers for all lemmas
+    in each window of `window` sentences are fetched at once. Yields a list of
+    matches per sentence.
+    """
+    for window_sents in chunked(sentences, window):
+        window_cache = {} if matcher_cache is None else matcher_cache
+        indexed = [index_sentence(surfs) for surfs in window_sents]
+        resolve_matchers(
+            conn, union_lemmas(lemma_map for lemma_map, _ in indexed), window_cache
+        )
+        for lemma_map, all_lemma_feats in indexed:
+            yield list(
+                extract_toks_indexed(
+                    conn,
+                    lemma_map,
+                    all_lemma_feats,
+                    extend_wildcards=extend_wildcards,
+                    matcher_cache=window_cache,
+                )
+            )
+
+
 def extract_toks_indexed(
     conn,
     lemma_map: Dict[str, int],
     all_lemma_feats: List[Dict[str, str]],
     extend_wildcards=True,
+    matcher_cache=None,
 ):
-    key_lemmas, words = get_matchers(conn, lemma_map)
+    all_lemma_feats = compile_sent_feats(all_lemma_feats)
     for lemma_idx, key_lemma, word in iter_match_cands(
-        conn, lemma_map, all_lemma_feats
+        conn, lemma_map, all_lemma_feats, matcher_cache
     ):
         # Check lemma and feats for other lemmas
-        subwords = list(enumerate(word["subwords"]))
-
         def step(dir):
-            return select_tok_step(
-                lambda n: n + dir,
+            return tok_dp_matchings(
+                dir,
                 extend_wildcards,
                 all_lemma_feats,
-                subwords,
+                word["subwords"],
                 lemma_idx + dir,
                 word["key_idx"] + dir,
-                FrozenDict(),
             )
 
         left_matches = step(-1)
@@ -166,15 +280,107 @@ def extract_toks_indexed(
         right_matches = step(1)
         if not right_matches:
             continue
-        key_matching = FrozenDict(((word["key_idx"], frozenset((lemma_idx,))),))
+        key_matching = matching_add(
+            empty_matching(len(word["subwords"])), word["key_idx"], lemma_idx
+        )
         all_matches = {
-            FrozenDict({**left_matching, **key_matching, **right_matching})
+            matching_to_frozendict(
+                matching_union(left_matching, key_matching, right_matching)
+            )
             for left_matching in left_matches
             for right_matching in right_matches
         }
         yield all_matches, word
 
 
+class DpEnd(Enum):
+    # Every subword has been matched
+    ACCEPT = enum.auto()
+    # The subword at this state can't match
+    REJECT = enum.auto()
+
+
+def select_tok_dp(
+    dir, extend_wildcards, all_lemma_feats, subwords, word_idx, matcher_idx
+):
+    """
+    Find all matchings of the subwords from `matcher_idx` onwards in direction
+    `dir` (1 or -1) against the tokens from `word_idx` onwards. Returns a set
+    of `FrozenDict`s from subword index to a frozenset of token indices.
+
+    This is a dynamic programming version of `select_tok_step`. A forward pass
+    simulates the matcher like an NFA to find which (matcher_idx, word_idx)
+    states are reachable. A backward pass then computes the matchings from
+    each reachable state exactly once.
+    """
+    return {
+        matching_to_frozendict(matching)
+        for matching in tok_dp_matchings(
+            dir, extend_wildcards, all_lemma_feats, subwords, word_idx, matcher_idx
+        )
+    }
+
+
+def tok_dp_matchings(
+    dir, extend_wildcards, all_lemma_feats, subwords, word_idx, matcher_idx
+) -> Set[Matching]:
+    """
+    As `select_tok_dp`, but returns `Matching` bitmask tuples.
+    """
+    num_subwords = len(subwords)
+    if matcher_idx < 0 or matcher_idx >= num_subwords:
+        # No subwords left in this direction
+        return {empty_matching(num_subwords)}
+    num_words = len(all_lemma_feats)
+    layers = []
+    frontier = {matcher_idx}
+    while frontier:
+        # Each state's successor matcher indices, or how it ends
+        layer: Dict[int, Union[DpEnd, Tuple[int, ...]]] = {}
+        next_frontier: Set[int] = set()
+        for cur_matcher_idx in frontier:
+            if cur_matcher_idx < 0 or cur_matcher_idx >= num_subwords:
+                layer[cur_matcher_idx] = DpEnd.ACCEPT
+                continue
+            if word_idx < 0 or word_idx >= num_words:
+                layer[cur_matcher_idx] = DpEnd.REJECT
+                continue
+            subword_idx, matcher_lemma_feats = subwords[cur_matcher_idx]
+            assert cur_matcher_idx == subword_idx
+            matches, is_wildcard_match = match_any(
+                matcher_lemma_feats, all_lemma_feats[word_idx]
+            )
+            if not matches:
+                layer[cur_matcher_idx] = DpEnd.REJECT
+                continue
+            next_matcher_idxs: Tuple[int, ...]
+            if is_wildcard_match and extend_wildcards:
+                next_matcher_idxs = (cur_matcher_idx, cur_matcher_idx + dir)
+            else:
+                next_matcher_idxs = (cur_matcher_idx + dir,)
+            layer[cur_matcher_idx] = next_matcher_idxs
+            next_frontier.update(next_matcher_idxs)
+        layers.append((word_idx, layer))
+        frontier = next_frontier
+        word_idx += dir
+    next_matchings: Dict[int, Set[Matching]] = {}
+    for word_idx, layer in reversed(layers):
+        cur_matchings: Dict[int, Set[Matching]] = {}
+        for cur_matcher_idx, step in layer.items():
+            if step is DpEnd.ACCEPT:
+                cur_matchings[cur_matcher_idx] = {empty_matching(num_subwords)}
+            elif step is DpEnd.REJECT:
+                cur_matchings[cur_matcher_idx] = set()
+            else:
+                cur_matchings[cur_matcher_idx] = {
+                    matching_add(matching, cur_matcher_idx, word_idx)
+                    for next_matcher_idx in step
+                    for matching in next_matchings[next_matcher_idx]
+                }
+        next_matchings = cur_matchings
+    return next_matchings[matcher_idx]
+
+
 def select_tok_step(
     next_idx,
     extend_wildcards,
@@ -184,6 +390,10 @@ def select_tok_step(
     matcher_idx,
     matchings,
 ):
+    """
+    As `select_tok_dp`, but with naive recursion which takes exponential time
+    with wildcards. `subwords` should be enumerated. Kept for comparison.
+    """
     if matcher_idx < 0 or matcher_idx >= len(subwords):
         return {matchings}
     if word_idx < 0 or word_idx >= len(all_lemma_feats):
@@ -241,40 +451,221 @@ def expand_node(tree_index, lemma_idx, cand_set=frozenset()):
     )
 
 
-def extract_deps(conn, sent, use_conllu_feats=False):
-    for idx, tok in enumerate(sent):
-        assert tok["id"] == idx + 1
-    tree = sent.to_tree()
+def index_conllu(sent, use_conllu_feats=False):
     if use_conllu_feats:
         # XXX: Might be good add an option to combine both?
-        lemma_map, all_lemma_feats = conllu_to_indexed(sent)
+        return conllu_to_indexed(sent)
     else:
-        lemma_map, all_lemma_feats = index_sentence((token["form"] for token in sent))
-    tree_index = {}
+        return index_sentence((token["form"] for token in sent))
+
+
+def extract_deps(
+    conn,
+    sent,
+    use_conllu_feats=False,
+    matcher_cache=None,
+    max_states: Optional[int] = None,
+):
+    lemma_map, all_lemma_feats = index_conllu(sent, use_conllu_feats)
+    return extract_deps_indexed(
+        conn,
+        sent,
+        lemma_map,
+        all_lemma_feats,
+        matcher_cache=matcher_cache,
+        max_states=max_states,
+    )
+
+
+def extract_deps_batch(
+    conn,
+    conllu_sents: Iterable[Any],
+    use_conllu_feats=False,
+    window=BATCH_WINDOW,
+    matcher_cache=None,
+    max_states: Optional[int] = None,
+):
+    """
+    Like `extract_deps` but over many sentences. See `extract_toks_batch`.
+    """
+    for window_sents in chunked(conllu_sents, window):
+        window_cache = {} if matcher_cache is None else matcher_cache
+        indexed = [index_conllu(sent, use_conllu_feats) for sent in window_sents]
+        resolve_matchers(
+            conn, union_lemmas(lemma_map for lemma_map, _ in indexed), window_cache
+        )
+        for sent, (lemma_map, all_lemma_feats) in zip(window_sents, indexed):
+            yield list(
+                extract_deps_indexed(
+                    conn,
+                    sent,
+                    lemma_map,
+                    all_lemma_feats,
+                    matcher_cache=window_cache,
+                    max_states=max_states,
+                )
+            )
+
+
+def extract_deps_indexed(
+    conn,
+    sent,
+    lemma_map,
+    all_lemma_feats,
+    matcher_cache=None,
+    max_states: Optional[int] = None,
+):
+    """
+    Yields the matchings of each word in `sent`. If `max_states` is given,
+    words whose search explores more states than that are skipped with a
+    warning.
+    """
+    all_lemma_feats = compile_sent_feats(all_lemma_feats)
+    for idx, tok in enumerate(sent):
+        assert tok["id"] == idx + 1
+    tree = sent.to_tree()
+    tree_index: Dict[int, Any] = {}
     make_tree_index(tree, tree_index)
     for lemma_idx, key_lemma, word in iter_match_cands(
-        conn, lemma_map, all_lemma_feats
+        conn, lemma_map, all_lemma_feats, matcher_cache
     ):
-        lemma_id = lemma_idx + 1
-        used_cands = frozenset((lemma_id,))
-        if word["key_is_head"]:
-            node = tree_index[lemma_idx]
-            head_idx = node.token["head"]
-            if head_idx != 0:
-                used_cands |= frozenset((head_idx,))
-        matches = select_dep_step(
-            all_lemma_feats,
-            tree_index,
-            word["subwords"],
-            expand_node(tree_index, lemma_id),
-            frozenset((lemma_id,)),
-            frozenset((word["key_idx"],)),
-            FrozenDict(((word["key_idx"], frozenset((lemma_idx,))),)),
-        )
+        try:
+            matches = select_dep_search(
+                all_lemma_feats,
+                tree_index,
+                word["subwords"],
+                lemma_idx + 1,
+                word["key_idx"],
+                max_states=max_states,
+            )
+        except DepSearchBudgetExceeded:
+            logger.warning(
+                "Gave up matching ud_mwe %s at token %s after exploring %s states",
+                word["ud_mwe_id"],
+                lemma_idx,
+                max_states,
+            )
+            continue
         if matches:
             yield matches, word
 
 
+class DepSearchBudgetExceeded(Exception):
+    pass
+
+
+def dep_match_table(all_lemma_feats, subwords, lemma_id, key_idx):
+    """
+    Returns a dict mapping each non-key subword to a dict of the 1-based token
+    ids it can match mapped to whether it is a wildcard match, or None if some
+    subword can match no token at all.
+    """
+    match_table = {}
+    for subword_idx, matcher_lemma_feats in subwords:
+        if subword_idx == key_idx:
+            continue
+        cands = {}
+        for cand_id, cand_lemma_feats in enumerate(all_lemma_feats, 1):
+            if cand_id == lemma_id:
+                continue
+            matches, is_wildcard_match = match_any(
+                matcher_lemma_feats, cand_lemma_feats
+            )
+            if matches:
+                cands[cand_id] = is_wildcard_match
+        if not cands:
+            return None
+        match_table[subword_idx] = cands
+    return match_table
+
+
+def select_dep_search(
+    all_lemma_feats,
+    tree_index,
+    subwords,
+    lemma_id,
+    key_idx,
+    extend_wildcards=True,
+    max_states: Optional[int] = None,
+):
+    """
+    Finds the same matchings as `select_dep_step` anchored with the key
+    subword at `lemma_id`. The set of tokens which can be matched next is
+    determined by the tokens used so far, so the matchings of the remaining
+    subwords are memoised on (used_subwords, used_cands). If `max_states` is
+    given, raises `DepSearchBudgetExceeded` if more than that many states are
+    explored.
+    """
+    match_table = dep_match_table(all_lemma_feats, subwords, lemma_id, key_idx)
+    if match_table is None:
+        return set()
+    memo: Dict[Any, Set[Matching]] = {}
+    num_subwords = len(subwords)
+
+    def expand_wildcard(subword_cands, cand_id, used_cands):
+        matched = 1 << (cand_id - 1)
+        cand_set = expand_node(tree_index, cand_id)
+        stack = list(cand_set - used_cands)
+        while stack:
+            next_id = stack.pop()
+            if next_id in used_cands or next_id not in subword_cands:
+                continue
+            assert subword_cands[next_id]
+            used_cands = used_cands | {next_id}
+            matched |= 1 << (next_id - 1)
+            next_cand_set = expand_node(tree_index, next_id)
+            stack.extend(next_cand_set - used_cands)
+            cand_set |= next_cand_set
+        return matched, cand_set, used_cands
+
+    def search(cand_set, used_cands, used_subwords):
+        state = (used_subwords, used_cands)
+        if state in memo:
+            return memo[state]
+        if max_states is not None and len(memo) >= max_states:
+            raise DepSearchBudgetExceeded()
+        remaining = [
+            subword_idx
+            for subword_idx in match_table
+            if subword_idx not in used_subwords
+        ]
+        all_matches: Set[Matching] = set()
+        if not remaining:
+            all_matches.add(empty_matching(num_subwords))
+        elif all(
+            any(cand_id not in used_cands for cand_id in match_table[subword_idx])
+            for subword_idx in remaining
+        ):
+            for cand_id in cand_set - used_cands:
+                for subword_idx in remaining:
+                    subword_cands = match_table[subword_idx]
+                    if cand_id not in subword_cands:
+                        continue
+                    new_cand_set = expand_node(tree_index, cand_id, cand_set)
+                    new_used_cands = used_cands | {cand_id}
+                    if subword_cands[cand_id] and extend_wildcards:
+                        matched, extra_cand_set, new_used_cands = expand_wildcard(
+                            subword_cands, cand_id, new_used_cands
+                        )
+                        new_cand_set |= extra_cand_set
+                    else:
+                        matched = 1 << (cand_id - 1)
+                    for matching in search(
+                        new_cand_set, new_used_cands, used_subwords | {subword_idx}
+                    ):
+                        all_matches.add(matching_set(matching, subword_idx, matched))
+        memo[state] = all_matches
+        return all_matches
+
+    key_matched = 1 << (lemma_id - 1)
+    return {
+        matching_to_frozendict(matching_set(matching, key_idx, key_matched))
+        for matching in search(
+            expand_node(tree_index, lemma_id), frozenset((lemma_id,)), frozenset()
+        )
+    }
+
+
 def select_dep_step(
     all_lemma_feats,
     tree_index,
@@ -285,6 +676,10 @@ def select_dep_step(
     matchings,
     extend_wildcards=True,
 ):
+    """
+    As `select_dep_search`, but with naive recursion, which revisits the same
+    states many times over. Kept for comparison.
+    """
     if len(used_subwords) == len(subwords):
         return {matchings}
     all_matches = set()
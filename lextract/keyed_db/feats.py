@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, Mapping, Tuple, Union
+
+FeatPairs = Union[Mapping[str, str], Iterable[Iterable[str]]]
+CompiledLemmaFeats = Dict[str, Tuple[int, ...]]
+
+_feat_bits: Dict[Tuple[str, str], int] = {}
+
+
+def feat_bit(feat: str, val: str) -> int:
+    """
+    Feature constraints are compiled into integer bitmasks over a vocabulary of
+    UD feature/value pairs so that a subset test is a single bitwise AND. The
+    vocabulary grows as new pairs are seen and is local to the process, so
+    masks should not be passed between processes.
+    """
+    key = (feat, val)
+    bit = _feat_bits.get(key)
+    if bit is None:
+        bit = 1 << len(_feat_bits)
+        _feat_bits[key] = bit
+    return bit
+
+
+def compile_feats(feats: FeatPairs) -> int:
+    if isinstance(feats, Mapping):
+        pairs: Iterable[Iterable[str]] = feats.items()
+    else:
+        pairs = feats
+    mask = 0
+    for feat, val in pairs:
+        mask |= feat_bit(feat, val)
+    return mask
+
+
+def compile_feats_list(feats_list: Iterable[FeatPairs]) -> Tuple[int, ...]:
+    return tuple(dict.fromkeys(compile_feats(feats) for feats in feats_list))
+
+
+def compile_lemma_feats(
+    lemma_feats: Mapping[str, Iterable[FeatPairs]]
+) -> CompiledLemmaFeats:
+    return {
+        lemma: compile_feats_list(feats_list)
+        for lemma, feats_list in lemma_feats.items()
+    }
+
+
+def any_subset(matcher_masks: Iterable[int], cand_masks: Iterable[int]) -> bool:
+    cand_masks = tuple(cand_masks)
+    for matcher_mask in matcher_masks:
+        for cand_mask in cand_masks:
+            if matcher_mask & cand_mask == matcher_mask:
+                return True
+    return False
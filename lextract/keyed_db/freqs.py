@@ -0,0 +1,110 @@
+import csv
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import click
+import conllu
+from wordfreq import word_frequency
+from wikiparse.utils.db import get_session
+
+
+def wordfreq_fi(lemma: str) -> float:
+    return word_frequency(lemma, "fi")
+
+
+class CorpusFreqs:
+    """
+    Relative frequencies of key lemmas, counted the same way they are looked
+    up at extraction time. Lemmas missing from the corpus have frequency 0.
+    Picklable, so it can be passed to worker processes.
+    """
+
+    def __init__(self, counts: Dict[str, int]) -> None:
+        self.counts = counts
+        self.total = sum(counts.values()) or 1
+
+    def __call__(self, lemma: str) -> float:
+        return self.counts.get(lemma, 0) / self.total
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusFreqs":
+        with open(path, newline="") as inf:
+            return cls(
+                {
+                    lemma: int(count)
+                    for lemma, count in csv.reader(inf, delimiter="\t")
+                }
+            )
+
+    def dump(self, path: str):
+        with open(path, "w", newline="") as outf:
+            writer = csv.writer(outf, delimiter="\t")
+            for lemma, count in Counter(self.counts).most_common():
+                writer.writerow([lemma, count])
+
+
+def count_key_lemmas(conllu_sents: Iterable, use_conllu_feats=False) -> Counter:
+    from .extract import index_conllu
+
+    counts: Counter = Counter()
+    for sent in conllu_sents:
+        lemma_map, _ = index_conllu(sent, use_conllu_feats)
+        for lemma, idxs in lemma_map.items():
+            counts[lemma] += len(idxs)
+    return counts
+
+
+def key_fanout(
+    key_lemma_counts: Iterable[Tuple[str, int]], freq
+) -> List[Tuple[str, int, float]]:
+    """
+    Given the number of words indexed under each key lemma, returns
+    (key lemma, words, expected matcher evaluations per token) for each key
+    lemma, worst first.
+    """
+    fanout = [
+        (key_lemma, num_words, num_words * freq(key_lemma))
+        for key_lemma, num_words in key_lemma_counts
+    ]
+    fanout.sort(key=lambda row: row[2], reverse=True)
+    return fanout
+
+
+@click.command("count-key-lemmas")
+@click.argument("conllu_in", type=click.File("r"), nargs=-1)
+@click.argument("freqs_out", type=click.Path(dir_okay=False))
+@click.option("--use-conllu-feats/--use-omorfi-feats")
+def count_key_lemmas_cmd(conllu_in, freqs_out: str, use_conllu_feats: bool):
+    """
+    Count how often each key lemma occurs in a corpus for add-keyed-words
+    --freqs and key-fanout
+    """
+    counts: Counter = Counter()
+    for inf in conllu_in:
+        counts.update(count_key_lemmas(conllu.parse_incr(inf), use_conllu_feats))
+    CorpusFreqs(counts).dump(freqs_out)
+
+
+@click.command("key-fanout")
+@click.option(
+    "--freqs",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Key lemma frequencies from count-key-lemmas rather than wordfreq",
+)
+@click.option("--top", default=50, help="Number of worst key lemmas to list")
+def key_fanout_cmd(freqs: Optional[str], top: int):
+    """
+    Report how many matchers are expected to be evaluated per token for the
+    keys in the database
+    """
+    from .queries import key_lemma_counts_query
+
+    freq = wordfreq_fi if freqs is None else CorpusFreqs.load(freqs)
+    session = get_session()
+    fanout = key_fanout(session.execute(key_lemma_counts_query()), freq)
+    total = sum(evals for _, _, evals in fanout)
+    click.echo(f"Expected matcher evaluations per token: {total:.4f}")
+    click.echo(f"Key lemmas: {len(fanout)}")
+    for key_lemma, num_words, evals in fanout[:top]:
+        share = evals / total if total else 0
+        click.echo(f"{key_lemma}\t{num_words}\t{evals:.6f}\t{share:.1%}")
@@ -0,0 +1,90 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from lextract.keyed_db.tables import tables
+from lextract.utils.db import has_table
+from .feats import compile_lemma_feats
+from .queries import (
+    all_key_lemmas_query,
+    all_word_subwords_query,
+)
+
+# Key lemma -> second key lemma, or None for no second key -> word ids
+KeyLemmas = Dict[str, Dict[Optional[str], Tuple[int, ...]]]
+
+
+def add_word_subword_row(words: Dict[int, Dict[str, Any]], row):
+    word_t = tables["word"]
+    subword_t = tables["subword"]
+    word_id = row[word_t.c.id]
+    if word_id not in words:
+        words[word_id] = {
+            "ud_mwe_id": row[word_t.c.ud_mwe_id],
+            "key_idx": row[word_t.c.key_idx],
+            "key_is_head": row[word_t.c.key_is_head],
+            "subwords": [],
+        }
+    words[word_id]["subwords"].append(
+        (
+            row[subword_t.c.subword_idx],
+            compile_lemma_feats(row[subword_t.c.lemma_feats]),
+        )
+    )
+
+
+def group_key_lemma_rows(rows) -> KeyLemmas:
+    """
+    Bucket the (key_lemma, key2_lemma, word_id) rows of `key_lemmas_query`
+    by key lemma and then second key lemma.
+    """
+    key_lemmas: Dict[str, Dict[Optional[str], Dict[int, None]]] = {}
+    for key_lemma, key2_lemma, word_id in rows:
+        key_lemmas.setdefault(key_lemma, {}).setdefault(key2_lemma, {})[
+            word_id
+        ] = None
+    return {
+        key_lemma: {
+            key2_lemma: tuple(word_ids) for key2_lemma, word_ids in buckets.items()
+        }
+        for key_lemma, buckets in key_lemmas.items()
+    }
+
+
+class KeyedMatcherIndex:
+    """
+    An in-memory copy of the key_lemma/key2_lemma/word/subword tables. It can
+    be passed to the extraction functions in `lextract.keyed_db.extract` in
+    place of a database connection, in which case no queries are made per
+    sentence.
+    """
+
+    key_lemmas: KeyLemmas
+    words: Dict[int, Dict[str, Any]]
+
+    def __init__(
+        self,
+        key_lemmas: KeyLemmas,
+        words: Dict[int, Dict[str, Any]],
+    ) -> None:
+        self.key_lemmas = key_lemmas
+        self.words = words
+
+    @classmethod
+    def load(cls, conn) -> "KeyedMatcherIndex":
+        key_lemmas = group_key_lemma_rows(
+            conn.execute(all_key_lemmas_query(has_table(conn, tables["key2_lemma"])))
+        )
+        words: Dict[int, Dict[str, Any]] = {}
+        for row in conn.execute(all_word_subwords_query()):
+            add_word_subword_row(words, row)
+        return cls(key_lemmas, words)
+
+    def get_matchers(self, all_lemmas: Iterable[str]):
+        key_lemmas = {}
+        for lemma in all_lemmas:
+            buckets = self.key_lemmas.get(lemma)
+            if buckets is not None:
+                key_lemmas[lemma] = buckets
+        return key_lemmas, self.words
+
+    def __len__(self) -> int:
+        return len(self.words)
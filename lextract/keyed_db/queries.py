@@ -1,41 +1,92 @@
-from sqlalchemy import select, bindparam
+from sqlalchemy import select, bindparam, exists, null
 
 
-def key_lemmas_query():
+def _key_lemmas_select(with_key2):
     from .tables import tables
 
     key_lemma = tables["key_lemma"]
     word = tables["word"]
-    return (
-        select([key_lemma.c.key_lemma, word.c.id])
-        .select_from(key_lemma.join(word, key_lemma.c.word_id == word.c.id))
-        .where(key_lemma.c.key_lemma.in_(bindparam("key_lemmas", expanding=True)))
+    key2_lemma = tables["key2_lemma"]
+    joined = key_lemma.join(word, key_lemma.c.word_id == word.c.id)
+    if not with_key2:
+        return select(
+            [key_lemma.c.key_lemma, null().label("key2_lemma"), word.c.id]
+        ).select_from(joined)
+    return select(
+        [key_lemma.c.key_lemma, key2_lemma.c.key2_lemma, word.c.id]
+    ).select_from(joined.outerjoin(key2_lemma, key2_lemma.c.word_id == word.c.id))
+
+
+def key_lemmas_query(with_key2=True):
+    """
+    Rows of (key_lemma, key2_lemma, word_id) for the words keyed by any of
+    `key_lemmas`, with one row per second key lemma, or a NULL key2_lemma if
+    there is no second key. Pass `with_key2=False` if the key2_lemma table
+    does not exist.
+    """
+    from .tables import tables
+
+    key_lemma = tables["key_lemma"]
+    return _key_lemmas_select(with_key2).where(
+        key_lemma.c.key_lemma.in_(bindparam("key_lemmas", expanding=True))
     )
 
 
+def all_key_lemmas_query(with_key2=True):
+    """
+    As `key_lemmas_query` but for all words.
+    """
+    from .tables import tables
+
+    key_lemma = tables["key_lemma"]
+    return _key_lemmas_select(with_key2).order_by(key_lemma.c.id)
+
+
+def all_key2_lemmas_query():
+    from .tables import tables
+
+    key2_lemma = tables["key2_lemma"]
+    return select([key2_lemma.c.key2_lemma, key2_lemma.c.word_id])
+
+
+def _word_subwords_select():
+    from .tables import tables
+
+    word = tables["word"]
+    subword = tables["subword"]
+    return select(
+        [
+            word.c.id,
+            word.c.key_idx,
+            word.c.key_is_head,
+            word.c.ud_mwe_id,
+            subword.c.word_id,
+            subword.c.subword_idx,
+            subword.c.lemma_feats,
+        ]
+    ).select_from(word.join(subword, subword.c.word_id == word.c.id))
+
+
 def word_subwords_query():
     from .tables import tables
 
     word = tables["word"]
     subword = tables["subword"]
     return (
-        select(
-            [
-                word.c.id,
-                word.c.key_idx,
-                word.c.key_is_head,
-                word.c.ud_mwe_id,
-                subword.c.word_id,
-                subword.c.subword_idx,
-                subword.c.lemma_feats,
-            ]
-        )
-        .select_from(word.join(subword, subword.c.word_id == word.c.id))
+        _word_subwords_select()
         .where(word.c.id.in_(bindparam("word_ids", expanding=True)))
         .order_by(subword.c.subword_idx,)
     )
 
 
+def all_word_subwords_query():
+    from .tables import tables
+
+    word = tables["word"]
+    subword = tables["subword"]
+    return _word_subwords_select().order_by(word.c.id, subword.c.subword_idx)
+
+
 def mwe_ids_as_gapped_mwes():
     from lextract.mweproc.db.tables import tables
 
@@ -46,3 +97,39 @@ def mwe_ids_as_gapped_mwes():
         .select_from(ud_mwe.join(mwe_fmt, mwe_fmt.c.mwe_id == ud_mwe.c.id))
         .where(ud_mwe.c.id == bindparam("ud_mwe_id"))
     )
+
+
+def unindexed_mwe_for_indexing():
+    from lextract.mweproc.db.queries import mwe_for_indexing
+    from lextract.mweproc.db.tables import tables as mweproc_tables
+    from .tables import tables
+
+    word = tables["word"]
+    ud_mwe = mweproc_tables["ud_mwe"]
+    return mwe_for_indexing().where(~exists().where(word.c.ud_mwe_id == ud_mwe.c.id))
+
+
+def orphaned_word_ids_query():
+    from lextract.mweproc.db.tables import tables as mweproc_tables
+    from .tables import tables
+
+    word = tables["word"]
+    ud_mwe = mweproc_tables["ud_mwe"]
+    return select([word.c.id]).where(~exists().where(ud_mwe.c.id == word.c.ud_mwe_id))
+
+
+def word_keys_query():
+    from .tables import tables
+
+    word = tables["word"]
+    return select([word.c.ud_mwe_id, word.c.id, word.c.key_idx, word.c.key_is_head])
+
+
+def key_lemma_counts_query():
+    from sqlalchemy import func
+    from .tables import tables
+
+    key_lemma = tables["key_lemma"]
+    return select([key_lemma.c.key_lemma, func.count(key_lemma.c.word_id)]).group_by(
+        key_lemma.c.key_lemma
+    )
@@ -1,10 +1,32 @@
+import json
 import sys
 import click
+import conllu
+from functools import partial
 from pprint import pprint
+from typing import Any, Dict, List, Optional
+from boltons.cacheutils import LRU
+from conllu.models import TokenList
 from finntk import get_omorfi
-from wikiparse.utils.db import get_session
+from more_itertools import chunked
 
-from .extract import extract_toks
+from lextract.utils.db import get_connection
+from lextract.utils.parallel import imap_bounded
+from .extract import (
+    DEP_MAX_STATES,
+    extract_deps_batch,
+    extract_toks,
+    extract_toks_batch,
+)
+from .index import KeyedMatcherIndex
+
+# Sentences sent to a worker at a time
+CONLLU_CHUNK_SIZE = 256
+# Key lemmas whose words each worker keeps when querying the database
+MATCHER_CACHE_SIZE = 10000
+
+_worker_conn: Any = None
+_worker_matcher_cache: Optional[LRU] = None
 
 
 @click.command("extract-toks")
@@ -19,5 +41,129 @@ def extract_toks_cmd():
         starts.append(start)
 
     surfs = [tok["surf"] for tok in tokenised]
-    session = get_session().get_bind()
-    pprint(list(extract_toks(session, surfs)))
+    conn = get_connection(read_only=True)
+    pprint(list(extract_toks(conn, surfs)))
+
+
+def init_extract_worker(use_index: bool, matcher_cache_size: int):
+    global _worker_conn, _worker_matcher_cache
+    conn = get_connection(read_only=True)
+    if use_index:
+        _worker_conn = KeyedMatcherIndex.load(conn)
+        _worker_matcher_cache = None
+    else:
+        _worker_conn = conn
+        _worker_matcher_cache = LRU(max_size=matcher_cache_size)
+
+
+def drop_multiword_tokens(sent: TokenList) -> TokenList:
+    # Multiword tokens and empty nodes have non-integer ids
+    return TokenList(
+        [tok for tok in sent if isinstance(tok["id"], int)], metadata=sent.metadata
+    )
+
+
+def sent_match_records(sent_id, matches) -> List[Dict[str, Any]]:
+    records = []
+    for matchings, word in matches:
+        for matching in matchings:
+            record = {} if sent_id is None else {"sent_id": sent_id}
+            record["ud_mwe_id"] = word["ud_mwe_id"]
+            record["tokens"] = [
+                sorted(matching[subword_idx]) for subword_idx in sorted(matching)
+            ]
+            records.append(record)
+    return records
+
+
+def extract_conllu_chunk(
+    deps: bool, use_conllu_feats: bool, max_states: Optional[int], numbered_sents
+):
+    # Sentences arrive serialised since TokenLists don't survive pickling
+    parsed = [
+        (sent_idx, conllu.parse(sent_conllu)[0])
+        for sent_idx, sent_conllu in numbered_sents
+    ]
+    sent_ids = [
+        sent.metadata.get("sent_id", str(sent_idx)) for sent_idx, sent in parsed
+    ]
+    sents = [drop_multiword_tokens(sent) for _, sent in parsed]
+    if deps:
+        matches_it = extract_deps_batch(
+            _worker_conn,
+            sents,
+            use_conllu_feats=use_conllu_feats,
+            matcher_cache=_worker_matcher_cache,
+            max_states=max_states,
+        )
+    else:
+        matches_it = extract_toks_batch(
+            _worker_conn,
+            ([tok["form"] for tok in sent] for sent in sents),
+            matcher_cache=_worker_matcher_cache,
+        )
+    return [
+        record
+        for sent_id, matches in zip(sent_ids, matches_it)
+        for record in sent_match_records(sent_id, matches)
+    ]
+
+
+@click.command("extract-conllu")
+@click.argument("conllu_in", type=click.File("r"), default="-")
+@click.argument("jsonl_out", type=click.File("w"), default="-")
+@click.option(
+    "--deps/--toks",
+    default=True,
+    help="Match over dependency trees or contiguous tokens",
+)
+@click.option("--use-conllu-feats/--use-omorfi-feats")
+@click.option(
+    "--use-index/--use-db",
+    help="Load the whole index into memory in each worker rather than querying",
+)
+@click.option("--jobs", default=1, help="Number of worker processes")
+@click.option("--chunk-size", default=CONLLU_CHUNK_SIZE)
+@click.option(
+    "--matcher-cache-size",
+    default=MATCHER_CACHE_SIZE,
+    help="Number of key lemmas to cache the words of in each worker with --use-db",
+)
+@click.option(
+    "--max-states",
+    default=DEP_MAX_STATES,
+    help="Give up matching a word after this many search states, or 0 for no limit",
+)
+def extract_conllu_cmd(
+    conllu_in,
+    jsonl_out,
+    deps,
+    use_conllu_feats,
+    use_index,
+    jobs,
+    chunk_size,
+    matcher_cache_size,
+    max_states,
+):
+    """
+    Stream the keyed_db matches in a CoNLL-U file out as JSON lines, one per
+    match, each with the sentence's sent_id, or its index if it has none, the
+    ud_mwe_id, and the 0-based indices of the tokens matched by each subword.
+    """
+    for records in imap_bounded(
+        partial(extract_conllu_chunk, deps, use_conllu_feats, max_states or None),
+        chunked(
+            (
+                (sent_idx, sent.serialize())
+                for sent_idx, sent in enumerate(conllu.parse_incr(conllu_in))
+            ),
+            chunk_size,
+        ),
+        jobs,
+        chunk_size=1,
+        initializer=init_extract_worker,
+        initargs=(use_index, matcher_cache_size),
+    ):
+        for record in records:
+            jsonl_out.write(json.dumps(record, ensure_ascii=False))
+            jsonl_out.write("\n")
@@ -26,6 +26,14 @@ def create_tables(metadata=None):
         Column("word_id", ForeignKey("word.id")),
     )
 
+    tables["key2_lemma"] = Table(
+        "key2_lemma",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("key2_lemma", String),
+        Column("word_id", ForeignKey("word.id"), index=True),
+    )
+
     tables["word"] = Table(
         "word",
         metadata,
@@ -1,5 +1,10 @@
+from typing import Iterator, Tuple
+
 from boltons.dictutils import FrozenDict
 
+# A matching as a bitmask of the token indices matched by each subword
+Matching = Tuple[int, ...]
+
 
 def frozendict_append(fd, k, v):
     return fd.updated({k: fd.get(k, frozenset()) | frozenset((v,))})
@@ -20,3 +25,51 @@ def frozendict_order_insert(fd, new_key, new_value):
     if not inserted:
         new.append((new_key, frozenset((new_value,))))
     return FrozenDict(new)
+
+
+def empty_matching(num_subwords: int) -> Matching:
+    return (0,) * num_subwords
+
+
+def matching_add(matching: Matching, subword_idx: int, tok_idx: int) -> Matching:
+    return (
+        matching[:subword_idx]
+        + (matching[subword_idx] | (1 << tok_idx),)
+        + matching[subword_idx + 1 :]
+    )
+
+
+def matching_set(matching: Matching, subword_idx: int, mask: int) -> Matching:
+    return matching[:subword_idx] + (mask,) + matching[subword_idx + 1 :]
+
+
+def matching_union(*matchings: Matching) -> Matching:
+    return tuple(map(_or_all, *matchings))
+
+
+def _or_all(*masks: int) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+
+def mask_bits(mask: int) -> Iterator[int]:
+    idx = 0
+    while mask:
+        if mask & 1:
+            yield idx
+        mask >>= 1
+        idx += 1
+
+
+def matching_to_frozendict(matching: Matching) -> FrozenDict:
+    """
+    Convert to the public representation: a `FrozenDict` from subword index
+    to a frozenset of token indices, leaving out unmatched subwords.
+    """
+    return FrozenDict(
+        (subword_idx, frozenset(mask_bits(mask)))
+        for subword_idx, mask in enumerate(matching)
+        if mask
+    )
@@ -1,20 +1,123 @@
 import contextlib
 import logging
+import multiprocessing as mp
+import traceback
+from queue import Empty
 import click_log
 import click
 import os
 
 from .core import all_wordlists, WORDLIST_NAMES
 from .db.confs import setup_dist, setup_embed
-from .db.tables import metadata
-from .db.muts import insert_mwe, insert_meta
-from ..utils.db import get_connection
+from .db.queries import checkpoints_query, headword_ids_query
+from .db.tables import add_build_checkpoint, metadata
+from .db.muts import (
+    insert_meta,
+    insert_prepared_mwe,
+    prepare_mwe,
+    save_checkpoint,
+)
+from ..utils.db import BulkInserter, get_connection
 from wikiparse.cmd.parse import mod_data_opt, fsts_dir_opt, parse_filterfile
 
 logger = logging.getLogger(__name__)
 click_log.basic_config(logger)
 
 BATCH_SIZE = 50000
+# Number of prepared MWEs sent from a worker at a time
+WORKER_BATCH_SIZE = 256
+# Maximum number of batches waiting for the writer
+QUEUE_SIZE = 64
+
+
+def iter_wordlist(wikiparse_conn, wl_name, headwords_list, skip, freqs):
+    for idx, (ud_mwe, _mwe_wl) in enumerate(
+        all_wordlists(wikiparse_conn, [wl_name], headwords_list)
+    ):
+        # Everything before the checkpoint has already been inserted
+        if idx < skip:
+            continue
+        yield prepare_mwe(ud_mwe, freqs=freqs, materialize=True)
+
+
+def produce_wordlist(queue, wl_name, wikiparse_db, headwords_list, skip, freqs):
+    try:
+        wikiparse_conn = get_connection(wikiparse_db)
+        batch = []
+        for prepared in iter_wordlist(
+            wikiparse_conn, wl_name, headwords_list, skip, freqs
+        ):
+            batch.append(prepared)
+            if len(batch) >= WORKER_BATCH_SIZE:
+                queue.put(("mwes", wl_name, batch))
+                batch = []
+        queue.put(("mwes", wl_name, batch))
+        queue.put(("done", wl_name, None))
+    except Exception:
+        queue.put(("error", wl_name, traceback.format_exc()))
+
+
+def iter_prepared_serial(wikiparse_conn, wl_names, headwords_list, skips, freqs):
+    for wl_name in wl_names:
+        for prepared in iter_wordlist(
+            wikiparse_conn, wl_name, headwords_list, skips[wl_name], freqs
+        ):
+            yield wl_name, prepared
+        yield wl_name, None
+
+
+def iter_prepared_parallel(wikiparse_db, wl_names, headwords_list, skips, freqs, jobs):
+    """
+    Prepare the MWEs from each of `wl_names` in its own worker process, with
+    at most `jobs` running at once. Yields (wordlist, prepared MWE) pairs,
+    followed by (wordlist, None) once a wordlist is exhausted.
+    """
+    queue: mp.Queue = mp.Queue(QUEUE_SIZE)
+    waiting = list(wl_names)
+    running = {}
+
+    def start():
+        wl_name = waiting.pop(0)
+        proc = mp.Process(
+            target=produce_wordlist,
+            args=(queue, wl_name, wikiparse_db, headwords_list, skips[wl_name], freqs),
+        )
+        proc.start()
+        running[wl_name] = proc
+
+    try:
+        while waiting and len(running) < jobs:
+            start()
+        while running:
+            try:
+                kind, wl_name, payload = queue.get(timeout=5)
+            except Empty:
+                for wl_name, proc in running.items():
+                    if not proc.is_alive() and proc.exitcode != 0:
+                        raise RuntimeError(
+                            f"Worker for {wl_name} died with exit code {proc.exitcode}"
+                        )
+                continue
+            if kind == "mwes":
+                for prepared in payload:
+                    yield wl_name, prepared
+            elif kind == "done":
+                running.pop(wl_name).join()
+                yield wl_name, None
+                if waiting:
+                    start()
+            else:
+                raise RuntimeError(f"Worker for {wl_name} failed:\n{payload}")
+    finally:
+        for proc in running.values():
+            proc.terminate()
+
+
+def load_checkpoints(conn):
+    return {
+        wordlist: (done, finished)
+        for wordlist, done, finished in conn.execute(checkpoints_query())
+    }
 
 
 @click.command()
@@ -24,21 +127,30 @@ BATCH_SIZE = 50000
     "--wl", type=click.Choice(WORDLIST_NAMES), multiple=True, default=WORDLIST_NAMES
 )
 @click.option("--headwords", type=click.File("r"))
+@click.option(
+    "--jobs",
+    default=1,
+    help="Number of wordlists to process at once in worker processes",
+)
 @mod_data_opt
 @fsts_dir_opt
 @click_log.simple_verbosity_option(logger)
-def builddb(embed, skip_freqs, wl, headwords):
+def builddb(embed, skip_freqs, wl, headwords, jobs):
     """
-    Insert MWEs into database
+    Insert MWEs into database. An interrupted build is resumed from the last
+    commit when rerun.
     """
     headwords_list = parse_filterfile(headwords)
     conn = get_connection()
     if embed:
         setup_embed()
     else:
-        conn.execute("PRAGMA synchronous = OFF;")
-        conn.execute("PRAGMA journal_mode = OFF;")
+        # Keep a journal so that a crash can only lose the batch since the
+        # last checkpoint, which is what resuming relies on
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
         setup_dist()
+    add_build_checkpoint()
     metadata.create_all(conn)
     if not embed:
         wikiparse_db = os.getenv("WIKIPARSE_URL")
@@ -46,35 +158,74 @@ def builddb(embed, skip_freqs, wl, headwords):
             raise RuntimeError("WIKIPARSE_URL not set")
         wikiparse_conn = get_connection(wikiparse_db)
     else:
+        # Workers connect to DATABASE_URL
+        wikiparse_db = None
         wikiparse_conn = conn
-    mwes = all_wordlists(wikiparse_conn, wl, headwords_list)
+    freqs = not embed and not skip_freqs
+    checkpoints = load_checkpoints(conn)
+    wl_names = []
+    done = {}
+    for wl_name in WORDLIST_NAMES:
+        if wl_name not in wl:
+            continue
+        wl_done, finished = checkpoints.get(wl_name, (0, False))
+        if finished:
+            logger.info("Skipping %s: already inserted", wl_name)
+            continue
+        if wl_done:
+            logger.info("Resuming %s after %s MWEs", wl_name, wl_done)
+        wl_names.append(wl_name)
+        done[wl_name] = wl_done
+    headword_freq_ids = {}
+    if freqs:
+        headword_freq_ids = dict(conn.execute(headword_ids_query()).fetchall())
+    if jobs > 1:
+        mwes = iter_prepared_parallel(
+            wikiparse_db, wl_names, headwords_list, dict(done), freqs, jobs
+        )
+    else:
+        mwes = iter_prepared_serial(
+            wikiparse_conn, wl_names, headwords_list, dict(done), freqs
+        )
     if logger.isEnabledFor(logging.INFO):
         ctx = contextlib.nullcontext(mwes)
     else:
         ctx = click.progressbar(mwes, label="Inserting MWEs")
     with ctx as mwes_wrap:
+        inserter = BulkInserter(conn)
+        finished_wls = set()
+
+        def commit():
+            inserter.flush()
+            for wl_name, wl_done in done.items():
+                save_checkpoint(conn, wl_name, wl_done, wl_name in finished_wls)
+            trans.commit()
+
         trans = conn.begin()
-        hw_cnts_cache = {}
+        since_commit = 0
         try:
-            for idx, (ud_mwe, mwe_wls) in enumerate(mwes_wrap):
-                insert_mwe(
-                    conn,
-                    ud_mwe,
-                    hw_cnts_cache,
-                    freqs=not embed and not skip_freqs,
-                    materialize=True,
-                )
-                if (idx + 1) % BATCH_SIZE == 0:
-                    trans.commit()
+            for wl_name, prepared in mwes_wrap:
+                if prepared is None:
+                    logger.info("Finished %s", wl_name)
+                    finished_wls.add(wl_name)
+                    continue
+                insert_prepared_mwe(inserter, prepared, headword_freq_ids)
+                done[wl_name] += 1
+                since_commit += 1
+                if since_commit >= BATCH_SIZE:
+                    commit()
                     trans = conn.begin()
-        except Exception:
+                    since_commit = 0
+        except BaseException:
             trans.rollback()
             raise
         else:
-            trans.commit()
+            commit()
     if not embed:
         trans = conn.begin()
         insert_meta(wikiparse_conn, conn)
         trans.commit()
         conn.execute("PRAGMA optimize;")
         conn.execute("VACUUM;")
+        # Leave a single self-contained file behind
+        conn.execute("PRAGMA journal_mode = DELETE;")
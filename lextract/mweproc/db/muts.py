@@ -1,4 +1,6 @@
 import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from ..models import UdMwe
 from ..enrichment.freq import (
     headword_freq,
@@ -10,9 +12,9 @@ from ..enrichment.freq import (
 from ..formatters.human import gapped_mwe, pos_template
 from ..formatters.turkudepsearch import tds, tds_tok
 from ..sources.wiktionary_headword import WiktionaryHeadwordLink
-from ...utils.db import update
+from ...utils.db import SessionInserter, update
 from .tables import tables
-from wikiparse.utils.db import insert_get_id, insert
+from wikiparse.utils.db import insert
 from wikiparse.cmd.parse import add_rev
 from wikiparse.db.insert import insert_metadata
 from wikiparse.db.tables import meta
@@ -24,68 +26,150 @@ def listify_poses(poses):
     return list(poses) if poses is not None else None
 
 
-def insert_mwe(session, mwe: UdMwe, hw_cnts_cache, freqs=False, materialize=False):
+@dataclass
+class PreparedMwe:
+    """
+    The rows for a single MWE. Everything which is expensive to compute is
+    computed up front so that it can be done away from the database writer.
+    """
+
+    gapped_mwe: str
+    ud_mwe: Dict[str, Any]
+    tokens: List[Dict[str, Any]]
+    links: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]
+    freqs: bool = False
+    headword_freq: Optional[Dict[str, Any]] = None
+    mwe_fmt: Optional[Dict[str, Any]] = None
+
+
+def prepare_mwe(mwe: UdMwe, freqs=False, materialize=False) -> PreparedMwe:
     gap_mwe = gapped_mwe(mwe)
-    logger.info("Inserting %s", gap_mwe)
-    mwe_id = insert_get_id(
-        session,
-        tables["ud_mwe"],
-        typ=mwe.typ,
-        poses=listify_poses(mwe.poses),
-        headword_idx=mwe.headword_idx,
-    )
-    for subword_idx, token in enumerate(mwe.tokens):
-        insert(
-            session,
-            tables["ud_mwe_token"],
-            mwe_id=mwe_id,
-            subword_idx=subword_idx,
-            payload=token.payload,
-            payload_is_lemma=token.payload_is_lemma,
-            poses=listify_poses(token.poses),
-            feats=token.feats,
-        )
+    links = []
     for link in mwe.links:
-        insert(
-            session,
-            tables["link"],
-            mwe_id=mwe_id,
-            name=link.link_name,
-            payload=link.get_cols(),
-        )
+        hw_link = None
         if isinstance(link, WiktionaryHeadwordLink):
-            insert(
-                session,
-                tables["wiktionary_hw_link"],
-                mwe_id=mwe_id,
-                page_exists=link.page_exists,
-                has_senses=link.has_senses,
-            )
-    if freqs:
-        insert_freqs(session, mwe_id, mwe, hw_cnts_cache)
+            hw_link = {"page_exists": link.page_exists, "has_senses": link.has_senses}
+        links.append(({"name": link.link_name, "payload": link.get_cols()}, hw_link))
+    headword_freq_row = None
+    headword = mwe.headword
+    if freqs and headword is not None:
+        headword_freq_row = headword_freq_values(
+            mwe, tds_tok(headword), headword.payload
+        )
+    mwe_fmt = None
     if materialize:
-        insert(
-            session,
-            tables["mwe_fmt"],
-            mwe_id=mwe_id,
-            gapped_mwe=gapped_mwe(mwe),
-            pos_info=pos_template(mwe),
-            turkudepsearch=tds(mwe),
+        mwe_fmt = {
+            "gapped_mwe": gap_mwe,
+            "pos_info": pos_template(mwe),
+            "turkudepsearch": tds(mwe),
+        }
+    return PreparedMwe(
+        gapped_mwe=gap_mwe,
+        ud_mwe={
+            "typ": mwe.typ,
+            "poses": listify_poses(mwe.poses),
+            "headword_idx": mwe.headword_idx,
+        },
+        tokens=[
+            {
+                "subword_idx": subword_idx,
+                "payload": token.payload,
+                "payload_is_lemma": token.payload_is_lemma,
+                "poses": listify_poses(token.poses),
+                "feats": token.feats,
+            }
+            for subword_idx, token in enumerate(mwe.tokens)
+        ],
+        links=links,
+        freqs=freqs,
+        headword_freq=headword_freq_row,
+        mwe_fmt=mwe_fmt,
+    )
+
+
+def headword_freq_values(mwe: UdMwe, lemma_query, lemma) -> Dict[str, Any]:
+    freqs_res = headword_freq(mwe)
+    assert freqs_res is not None
+    return {
+        "lemma_query": lemma_query,
+        "lemma": lemma,
+        "wordfreq": freqs_res[0],
+        "wordfreq_zipf": freqs_res[1],
+        # "internet_parsebank_cnt": turkudepsearch_headword_freq(lemma_query),
+    }
+
+
+def get_headword_freq_id(inserter, headword_freq_row, headword_freq_ids) -> int:
+    """
+    Get the id of the headword frequency for `headword_freq_row`'s lemma
+    query from `headword_freq_ids`, inserting it and adding it there if it is
+    not yet present.
+    """
+    lemma_query = headword_freq_row["lemma_query"]
+    headword_freq_id = headword_freq_ids.get(lemma_query)
+    if headword_freq_id is None:
+        headword_freq_id = inserter.insert_get_id(
+            tables["headword_freq"], **headword_freq_row
         )
+        headword_freq_ids[lemma_query] = headword_freq_id
+    return headword_freq_id
+
+
+def session_headword_freq_ids(session, prepared: PreparedMwe) -> Dict[str, int]:
+    """
+    The ids of the headword frequencies in `session` needed by `prepared`.
+    """
+    from .queries import headword_id_query
+
+    headword_freq_ids = {}
+    if prepared.headword_freq is not None:
+        lemma_query = prepared.headword_freq["lemma_query"]
+        headword_freq_id = session.execute(headword_id_query(lemma_query)).scalar()
+        if headword_freq_id is not None:
+            headword_freq_ids[lemma_query] = headword_freq_id
+    return headword_freq_ids
+
+
+def insert_prepared_mwe(inserter, prepared: PreparedMwe, headword_freq_ids):
+    """
+    Insert `prepared` with `inserter`, which is a `BulkInserter` or a
+    `SessionInserter`. `headword_freq_ids` maps the lemma queries of already
+    inserted headword frequencies to their ids and is updated with any new
+    ones.
+    """
+    logger.info("Inserting %s", prepared.gapped_mwe)
+    ud_mwe = prepared.ud_mwe
+    if prepared.freqs:
+        headword_freq_id = None
+        if prepared.headword_freq is not None:
+            headword_freq_id = get_headword_freq_id(
+                inserter, prepared.headword_freq, headword_freq_ids
+            )
+        ud_mwe = {**ud_mwe, "headword_freq_id": headword_freq_id}
+    mwe_id = inserter.insert_get_id(tables["ud_mwe"], **ud_mwe)
+    for token in prepared.tokens:
+        inserter.insert(tables["ud_mwe_token"], mwe_id=mwe_id, **token)
+    for link, hw_link in prepared.links:
+        inserter.insert(tables["link"], mwe_id=mwe_id, **link)
+        if hw_link is not None:
+            inserter.insert(tables["wiktionary_hw_link"], mwe_id=mwe_id, **hw_link)
+    if prepared.mwe_fmt is not None:
+        inserter.insert(tables["mwe_fmt"], mwe_id=mwe_id, **prepared.mwe_fmt)
         # TODO: separate defn from links
+    return mwe_id
+
+
+def insert_mwe(session, mwe: UdMwe, hw_cnts_cache=None, freqs=False, materialize=False):
+    # hw_cnts_cache is unused while insert_freqs' propbank counts are disabled
+    prepared = prepare_mwe(mwe, freqs=freqs, materialize=materialize)
+    return insert_prepared_mwe(
+        SessionInserter(session), prepared, session_headword_freq_ids(session, prepared)
+    )
 
 
 def insert_headword_freqs(session, mwe, lemma_query, lemma):
-    freqs_res = headword_freq(mwe)
-    assert freqs_res is not None
-    headword_freq_id = insert_get_id(
-        session,
-        tables["headword_freq"],
-        lemma_query=lemma_query,
-        lemma=lemma,
-        wordfreq=freqs_res[0],
-        wordfreq_zipf=freqs_res[1],
-        # internet_parsebank_cnt=turkudepsearch_headword_freq(lemma_query),
+    headword_freq_id = SessionInserter(session).insert_get_id(
+        tables["headword_freq"], **headword_freq_values(mwe, lemma_query, lemma)
     )
     # hw_cnts = turkudepsearch_propbank_headword_freqs(lemma_query)
     # for prop, cnt in hw_cnts.items():
@@ -100,17 +184,15 @@ def insert_headword_freqs(session, mwe, lemma_query, lemma):
 
 
 def insert_freqs(session, mwe_id: int, mwe: UdMwe, hw_cnts_cache):
-    from .queries import headword_id_query
-
-    headword = mwe.headword
-    if headword is not None:
-        lemma_query = tds_tok(headword)
-        headword_freq_id = session.execute(headword_id_query(lemma_query)).scalar()
-        if headword_freq_id is None:
-            lemma = headword.payload
-            # , hw_cnts
-            headword_freq_id = insert_headword_freqs(session, mwe, lemma_query, lemma)
-            # hw_cnts_cache[lemma_query] = hw_cnts
+    prepared = prepare_mwe(mwe, freqs=True)
+    if prepared.headword_freq is not None:
+        # , hw_cnts
+        headword_freq_id = get_headword_freq_id(
+            SessionInserter(session),
+            prepared.headword_freq,
+            session_headword_freq_ids(session, prepared),
+        )
+        # hw_cnts_cache[lemma_query] = hw_cnts
         # else:
         # hw_cnts = hw_cnts_cache[lemma_query]
         update(session, tables["ud_mwe"], mwe_id, headword_freq_id=headword_freq_id)
@@ -146,6 +228,17 @@ def insert_freqs(session, mwe_id: int, mwe: UdMwe, hw_cnts_cache):
 #        )
 
 
+def save_checkpoint(session, wordlist: str, done: int, finished: bool):
+    checkpoint_t = tables["build_checkpoint"]
+    result = session.execute(
+        checkpoint_t.update()
+        .where(checkpoint_t.c.wordlist == wordlist)
+        .values(done=done, finished=finished)
+    )
+    if result.rowcount == 0:
+        insert(session, checkpoint_t, wordlist=wordlist, done=done, finished=finished)
+
+
 def insert_meta(wikiparse_conn, finnmwe_conn):
     from .queries import meta_query
 
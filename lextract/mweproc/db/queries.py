@@ -79,6 +79,19 @@ def headword_id_query(lemma_query):
     )
 
 
+def headword_ids_query():
+    return select(
+        [tables["headword_freq"].c.lemma_query, tables["headword_freq"].c.id]
+    )
+
+
+def checkpoints_query():
+    checkpoint_t = tables["build_checkpoint"]
+    return select(
+        [checkpoint_t.c.wordlist, checkpoint_t.c.done, checkpoint_t.c.finished]
+    )
+
+
 def content_cols(table):
     return (col for col in table.columns if col.key not in ("id", "mwe_id"))
 
@@ -76,6 +76,17 @@ def add_meta():
     )
 
 
+@run_once
+def add_build_checkpoint():
+    add_table(
+        "build_checkpoint",
+        Column("id", Integer, primary_key=True),
+        Column("wordlist", String, unique=True, nullable=False),
+        Column("done", Integer, nullable=False),
+        Column("finished", Boolean, nullable=False),
+    )
+
+
 @run_once
 def add_freq():
     add_table(
@@ -0,0 +1,397 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import click
+import click_log
+import conllu
+import orjson
+from conllu.parser import ParseException
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+# Maximum number of sentences/lines extracted by a worker at a time
+MAX_BATCH = 256
+# Time to wait for more requests to batch together, in seconds
+MAX_WAIT = 0.005
+# Maximum number of sentences/lines waiting for a worker
+QUEUE_SIZE = 4096
+MAX_BODY = 64 * 1024 * 1024
+
+_keyed_index: Any = None
+
+
+def init_worker(use_fin: bool, use_keyed: bool):
+    global _keyed_index
+    from lextract.utils.lemmatise import fi_lemmatise
+
+    fi_lemmatise("olla")
+    if use_fin:
+        from lextract.aho_corasick import get_extractor
+
+        get_extractor("FinExtractor")
+    if use_keyed:
+        from lextract.keyed_db.index import KeyedMatcherIndex
+        from lextract.utils.db import get_connection
+
+        _keyed_index = KeyedMatcherIndex.load(get_connection(read_only=True))
+
+
+def ping() -> int:
+    return os.getpid()
+
+
+def tagging_to_json(tagging) -> Dict[str, Any]:
+    return {
+        "tokens": [
+            {
+                "token": token.token,
+                "anchors": [asdict(anchor) for anchor in token.anchors],
+                "tags": [
+                    {
+                        "lemma": tag.lemma,
+                        "synsets": tag.wn_synset_names,
+                        "rank": tag.rank,
+                        "lemma_path": tag.lemma_path,
+                        "supports": [asdict(support) for support in tag.supports],
+                        "finnpos_feats": tag.finnpos_feats,
+                    }
+                    for tag in token.tags
+                ],
+            }
+            for token in tagging.tokens
+        ]
+    }
+
+
+def tag_fin_lines(lines: List[str]) -> List[Dict[str, Any]]:
+    from lextract.aho_corasick import get_extractor
+
+    extractor = get_extractor("FinExtractor")
+    return [
+        tagging_to_json(tagging)
+        for tagging in extractor.extract_many(lines, light=True)
+    ]
+
+
+def keyed_toks(sentences: List[List[str]]) -> List[List[Dict[str, Any]]]:
+    from lextract.keyed_db.extract import extract_toks_batch
+    from lextract.keyed_db.repl import sent_match_records
+
+    return [
+        sent_match_records(None, matches)
+        for matches in extract_toks_batch(_keyed_index, sentences)
+    ]
+
+
+def keyed_deps(
+    args: List[Tuple[str, bool]]
+) -> List[Union[str, List[List[Dict[str, Any]]]]]:
+    """
+    Returns the matches of each CoNLL-U document, or an error message if it
+    could not be parsed, so that one bad request doesn't fail its whole batch.
+    """
+    from lextract.keyed_db.extract import DEP_MAX_STATES, extract_deps
+    from lextract.keyed_db.repl import drop_multiword_tokens, sent_match_records
+
+    results: List[Union[str, List[List[Dict[str, Any]]]]] = []
+    for conllu_str, use_conllu_feats in args:
+        try:
+            sents = conllu.parse(conllu_str)
+        except ParseException as exc:
+            results.append(f"Invalid CoNLL-U: {exc}")
+            continue
+        sents_records = []
+        for sent_idx, sent in enumerate(sents):
+            sent_id = sent.metadata.get("sent_id", str(sent_idx))
+            matches = extract_deps(
+                _keyed_index,
+                drop_multiword_tokens(sent),
+                use_conllu_feats=use_conllu_feats,
+                max_states=DEP_MAX_STATES,
+            )
+            sents_records.append(sent_match_records(sent_id, matches))
+        results.append(sents_records)
+    return results
+
+
+def submit(pool, func: Callable, *args) -> "asyncio.Future[Any]":
+    """
+    Run `func(*args)` in a `ProcessPoolExecutor` as an asyncio future. If a
+    worker dies, this fails with `BrokenProcessPool` rather than hanging.
+    """
+    return asyncio.get_event_loop().run_in_executor(pool, func, *args)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent requests into batches of up to
+    `max_batch` items, waiting at most `max_wait` seconds for a batch to
+    fill, and runs each with `run_batch`. At most `max_in_flight` batches run
+    at once.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_in_flight: int,
+        max_batch: int = MAX_BATCH,
+        max_wait: float = MAX_WAIT,
+    ) -> None:
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue: "asyncio.Queue[Tuple[Any, asyncio.Future[Any]]]" = asyncio.Queue(
+            QUEUE_SIZE
+        )
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    async def submit(self, item: Any) -> Any:
+        fut = asyncio.get_event_loop().create_future()
+        await self.queue.put((item, fut))
+        return await fut
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        return await asyncio.gather(*(self.submit(item) for item in items))
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+            await self.in_flight.acquire()
+            asyncio.ensure_future(self.dispatch(batch))
+
+    async def dispatch(self, batch: List[Tuple[Any, "asyncio.Future[Any]"]]):
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+        else:
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+        finally:
+            self.in_flight.release()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ExtractionService:
+    """
+    A minimal HTTP/1.1 JSON service. Each endpoint takes a POSTed JSON object
+    and returns one:
+
+     * /fin: {"lines": [str]} -> {"taggings": [tagging]}
+     * /keyed/toks: {"sentences": [[str]]} -> {"matches": [[match]]}
+     * /keyed/deps: {"conllu": str, "use_conllu_feats": bool}
+       -> {"matches": [[match]]}
+
+    GET /health returns {"ok": true}.
+    """
+
+    def __init__(self, pool, jobs: int, use_fin: bool, use_keyed: bool) -> None:
+        self.pool = pool
+        self.jobs = jobs
+        self.use_fin = use_fin
+        self.use_keyed = use_keyed
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self.routes: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        if use_fin:
+            self.add_route("/fin", tag_fin_lines, self.handle_fin)
+        if use_keyed:
+            self.add_route("/keyed/toks", keyed_toks, self.handle_keyed_toks)
+            self.add_route("/keyed/deps", keyed_deps, self.handle_keyed_deps)
+
+    def add_route(self, path: str, func: Callable, handler):
+        async def run_batch(items):
+            return await submit(self.pool, func, items)
+
+        self.batchers[path] = MicroBatcher(run_batch, self.jobs)
+        self.routes[path] = handler
+
+    async def handle_fin(self, body):
+        lines = body.get("lines")
+        if not isinstance(lines, list) or not all(isinstance(x, str) for x in lines):
+            raise HttpError(400, "Expected lines: [str]")
+        return {"taggings": await self.batchers["/fin"].submit_many(lines)}
+
+    async def handle_keyed_toks(self, body):
+        sentences = body.get("sentences")
+        if not isinstance(sentences, list) or not all(
+            isinstance(sent, list) and all(isinstance(tok, str) for tok in sent)
+            for sent in sentences
+        ):
+            raise HttpError(400, "Expected sentences: [[str]]")
+        return {"matches": await self.batchers["/keyed/toks"].submit_many(sentences)}
+
+    async def handle_keyed_deps(self, body):
+        conllu_str = body.get("conllu")
+        if not isinstance(conllu_str, str):
+            raise HttpError(400, "Expected conllu: str")
+        use_conllu_feats = bool(body.get("use_conllu_feats", False))
+        matches = await self.batchers["/keyed/deps"].submit(
+            (conllu_str, use_conllu_feats)
+        )
+        if isinstance(matches, str):
+            raise HttpError(400, matches)
+        return {"matches": matches}
+
+    async def warmup(self):
+        start = time.time()
+        # Pool workers run init_worker before taking tasks
+        pids = await asyncio.gather(
+            *(submit(self.pool, ping) for _ in range(self.jobs))
+        )
+        logger.info("%s workers ready in %.1fs", len(set(pids)), time.time() - start)
+        for batcher in self.batchers.values():
+            batcher.start()
+
+    async def respond(self, writer, status: int, payload: Any, keep_alive: bool):
+        body = orjson.dumps(payload)
+        headers = [
+            f"HTTP/1.1 {status} {REASONS[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: " + ("keep-alive" if keep_alive else "close"),
+        ]
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("ascii") + body)
+        await writer.drain()
+
+    async def handle_request(self, method: str, path: str, body: bytes):
+        if path == "/health":
+            return {"ok": True}
+        if path not in self.routes:
+            raise HttpError(404, f"No such endpoint {path}")
+        if method != "POST":
+            raise HttpError(405, "Expected POST")
+        try:
+            parsed = orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise HttpError(400, f"Invalid JSON: {exc}")
+        if not isinstance(parsed, dict):
+            raise HttpError(400, "Expected a JSON object")
+        return await self.routes[path](parsed)
+
+    async def handle_conn(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Bad request"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Without a length, the next request can't be found either
+                    await self.respond(
+                        writer, 400, {"error": "Bad Content-Length"}, False
+                    )
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {"error": "Body too large"}, False)
+                    break
+                body = await reader.readexactly(length)
+                try:
+                    status, payload = 200, await self.handle_request(method, path, body)
+                except HttpError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except Exception as exc:
+                    logger.exception("Error handling %s", path)
+                    status, payload = 500, {"error": repr(exc)}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve_forever(
+    host: str, port: int, jobs: int, use_fin: bool, use_keyed: bool
+):
+    with ProcessPoolExecutor(
+        jobs, initializer=init_worker, initargs=(use_fin, use_keyed)
+    ) as pool:
+        service = ExtractionService(pool, jobs, use_fin, use_keyed)
+        await service.warmup()
+        server = await asyncio.start_server(service.handle_conn, host, port)
+        logger.info("Listening on %s:%s", host, port)
+        async with server:
+            await server.serve_forever()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=8765)
+@click.option("--jobs", default=1, help="Number of worker processes")
+@click.option("--fin/--no-fin", default=True, help="Serve the Finnish extractor")
+@click.option(
+    "--keyed/--no-keyed",
+    default=True,
+    help="Serve keyed_db extraction from an index of DATABASE_URL",
+)
+@click_log.simple_verbosity_option(logger)
+def serve(host: str, port: int, jobs: int, fin: bool, keyed: bool):
+    """
+    Serve extraction over HTTP/JSON from a pool of warmed up workers
+    """
+    asyncio.run(serve_forever(host, port, jobs, fin, keyed))
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,26 +1,140 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, select, Table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import SingletonThreadPool
+from wikiparse.utils.db import insert, insert_get_id
 
 
 _query_cache: Dict[Any, Any] = {}
+_engines: Dict[Tuple[int, str, bool], Engine] = {}
 
+SQLITE_READ_PRAGMAS = [
+    "mmap_size = 1073741824",
+    # Negative means KiB rather than pages
+    "cache_size = -262144",
+    "temp_store = MEMORY",
+    "query_only = ON",
+]
 
-def get_connection(db=None):
-    # TODO: Increase cache size for sqlite to 32768 at this point?
-    # TODO: Enable mmap for sqlite at this point?
 
+def _set_sqlite_read_pragmas(dbapi_conn, _conn_record):
+    cursor = dbapi_conn.cursor()
+    for pragma in SQLITE_READ_PRAGMAS:
+        cursor.execute("PRAGMA " + pragma)
+    cursor.close()
+
+
+def get_engine(db=None, read_only=False) -> Engine:
+    """
+    Get the engine for `db`, by default DATABASE_URL, creating it on first
+    use in each process. All engines share one compiled query cache.
+
+    With `read_only`, SQLite connections are opened with
+    `SQLITE_READ_PRAGMAS` and kept open per thread rather than reopened, so
+    that their page cache survives between queries.
+    """
     if db is None:
         db = os.getenv("DATABASE_URL")
         if db is None:
             raise RuntimeError("DATABASE_URL not set")
-    engine = create_engine(
-        db, execution_options={"autocommit": False, "compiled_cache": _query_cache}
-    )
+    # Pooled connections must not be shared with forked children
+    key = (os.getpid(), db, read_only)
+    engine = _engines.get(key)
+    if engine is None:
+        kwargs: Dict[str, Any] = {}
+        is_sqlite = make_url(db).drivername.startswith("sqlite")
+        if read_only and is_sqlite:
+            kwargs["poolclass"] = SingletonThreadPool
+        engine = create_engine(
+            db,
+            execution_options={"autocommit": False, "compiled_cache": _query_cache},
+            **kwargs
+        )
+        if read_only and is_sqlite:
+            event.listen(engine, "connect", _set_sqlite_read_pragmas)
+        _engines[key] = engine
+    return engine
+
+
+def get_connection(db=None, read_only=False):
+    return get_engine(db, read_only).connect()
 
-    return engine.connect()
+
+def has_table(conn, table: Table) -> bool:
+    """
+    Check whether `table` exists in the database of `conn`, which can be an
+    engine, connection or session. Tables added to the schema since a
+    database was built are missing from it.
+    """
+    if isinstance(conn, Engine):
+        return conn.has_table(table.name, schema=table.schema)
+    if not isinstance(conn, Connection):
+        conn = conn.connection()
+    return conn.dialect.has_table(conn, table.name, schema=table.schema)
 
 
 def update(session, table, pk, **kwargs):
     return session.execute(table.update().where(table.c.id == pk).values(**kwargs))
+
+
+class SessionInserter:
+    """
+    Inserts rows immediately. Has the same interface as `BulkInserter`.
+    """
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def insert(self, table: Table, **values):
+        insert(self.session, table, **values)
+
+    def insert_get_id(self, table: Table, **values) -> int:
+        return insert_get_id(self.session, table, **values)
+
+    def flush(self):
+        pass
+
+
+class BulkInserter:
+    """
+    Buffers rows so that each table can be written with a single executemany
+    upon `flush`. Primary keys are allocated up front, counting up from the
+    largest existing one, so that rows referring to each other can be buffered
+    together. This is only safe while nothing else inserts into the same
+    tables.
+    """
+
+    def __init__(self, session) -> None:
+        self.session = session
+        self.rows: Dict[Table, List[Dict[str, Any]]] = {}
+        self.next_ids: Dict[Table, int] = {}
+
+    def alloc_id(self, table: Table) -> int:
+        if table not in self.next_ids:
+            max_id = self.session.execute(select([func.max(table.c.id)])).scalar()
+            self.next_ids[table] = (max_id or 0) + 1
+        new_id = self.next_ids[table]
+        self.next_ids[table] += 1
+        return new_id
+
+    def insert(self, table: Table, **values):
+        self.rows.setdefault(table, []).append(values)
+
+    def insert_get_id(self, table: Table, **values) -> int:
+        new_id = self.alloc_id(table)
+        self.insert(table, id=new_id, **values)
+        return new_id
+
+    def flush(self):
+        if not self.rows:
+            return
+        # Insert referenced tables first
+        sorted_tables = next(iter(self.rows)).metadata.sorted_tables
+        for table in sorted_tables:
+            rows = self.rows.get(table)
+            if rows:
+                self.session.execute(table.insert(), rows)
+        self.rows = {}
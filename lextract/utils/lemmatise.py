@@ -1,9 +1,24 @@
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from multiprocessing.util import Finalize
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
 from finntk.omor.extract import extract_true_lemmas_span
 
+LEMMA_CACHE_SIZE = 65536
+DISK_CACHE_COMMIT_EVERY = 1024
+# Seconds after which pending analyses are written even if there are few
+DISK_CACHE_COMMIT_SECS = 30.0
 
-def fi_lemmatise(x, return_pos=False):
+
+def analyse(surf, return_pos=False):
     result = extract_true_lemmas_span(
-        x.lower(), norm_func=lambda x: x.lower(), return_pos=return_pos
+        surf, norm_func=lambda x: x.lower(), return_pos=return_pos
     )
     if return_pos:
         return {
@@ -21,3 +36,137 @@ def fi_lemmatise(x, return_pos=False):
             }
             for k, v in result.items()
         }
+
+
+class LemmaDiskCache:
+    """
+    A cache of analyses keyed by lowercased surface form stored in a sqlite
+    file so that it persists between runs. It should be deleted whenever the
+    analyser is upgraded. Several processes can share one cache: new analyses
+    are buffered in memory and written in one short transaction every
+    DISK_CACHE_COMMIT_EVERY puts or DISK_CACHE_COMMIT_SECS seconds, so no
+    process holds the write lock for long. The rest is written when the
+    process exits, including multiprocessing workers, which skip atexit.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.pid: Optional[int] = None
+        self.pending: Dict[Tuple[str, bool], bytes] = {}
+        self.pending_since = 0.0
+
+    def connect(self) -> sqlite3.Connection:
+        # Reconnect in forked children rather than sharing the parent's connection
+        if self.conn is None or self.pid != os.getpid():
+            self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            # Readers and the writer don't block each other in WAL mode
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            with self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS lemma_cache ("
+                    "surf TEXT NOT NULL, "
+                    "return_pos INTEGER NOT NULL, "
+                    "result BLOB NOT NULL, "
+                    "PRIMARY KEY (surf, return_pos))"
+                )
+            self.pid = os.getpid()
+            # Anything pending was inherited from the parent, which writes it
+            self.pending = {}
+            # Unlike atexit handlers, these also run in multiprocessing workers
+            Finalize(self, self.flush, exitpriority=10)
+        return self.conn
+
+    def get(self, surf: str, return_pos: bool) -> Optional[Dict[str, FrozenSet[Any]]]:
+        with self.lock:
+            conn = self.connect()
+            pickled = self.pending.get((surf, return_pos))
+            if pickled is None:
+                row = conn.execute(
+                    "SELECT result FROM lemma_cache WHERE surf = ? AND return_pos = ?",
+                    (surf, return_pos),
+                ).fetchone()
+                if row is None:
+                    return None
+                pickled = row[0]
+        return pickle.loads(pickled)
+
+    def put(self, surf: str, return_pos: bool, result: Dict[str, FrozenSet[Any]]):
+        with self.lock:
+            self.connect()
+            if not self.pending:
+                self.pending_since = time.monotonic()
+            self.pending[surf, return_pos] = pickle.dumps(result)
+            if (
+                len(self.pending) >= DISK_CACHE_COMMIT_EVERY
+                or time.monotonic() - self.pending_since >= DISK_CACHE_COMMIT_SECS
+            ):
+                self._commit()
+
+    def flush(self):
+        with self.lock:
+            if self.conn is not None and self.pid == os.getpid():
+                self._commit()
+
+    def _commit(self):
+        assert self.conn is not None
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO lemma_cache VALUES (?, ?, ?)",
+                (
+                    (surf, return_pos, pickled)
+                    for (surf, return_pos), pickled in self.pending.items()
+                ),
+            )
+        self.pending = {}
+
+
+_disk_cache: Optional[LemmaDiskCache] = None
+_disk_cache_configured = False
+
+
+def set_lemma_cache(path: Optional[str]):
+    """
+    Use the on-disk cache at `path` for `fi_lemmatise`, or no on-disk cache if
+    `path` is None. By default, the path is taken from LEMMA_CACHE.
+    """
+    global _disk_cache, _disk_cache_configured
+    if _disk_cache is not None:
+        _disk_cache.flush()
+    _disk_cache = LemmaDiskCache(path) if path else None
+    _disk_cache_configured = True
+    cached_analyse.cache_clear()
+
+
+def get_lemma_cache() -> Optional[LemmaDiskCache]:
+    if not _disk_cache_configured:
+        set_lemma_cache(os.getenv("LEMMA_CACHE"))
+    return _disk_cache
+
+
+@atexit.register
+def flush_lemma_cache():
+    if _disk_cache is not None:
+        _disk_cache.flush()
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def cached_analyse(surf: str, return_pos: bool) -> Dict[str, FrozenSet[Any]]:
+    disk_cache = get_lemma_cache()
+    if disk_cache is not None:
+        result = disk_cache.get(surf, return_pos)
+        if result is not None:
+            return result
+    result = {k: frozenset(v) for k, v in analyse(surf, return_pos).items()}
+    if disk_cache is not None:
+        disk_cache.put(surf, return_pos, result)
+    return result
+
+
+def fi_lemmatise(x, return_pos=False):
+    # Callers are free to mutate the result, so it is copied out of the cache
+    return {k: set(v) for k, v in cached_analyse(x.lower(), bool(return_pos)).items()}
@@ -0,0 +1,50 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, TypeVar
+
+from more_itertools import chunked
+
+In = TypeVar("In")
+Out = TypeVar("Out")
+
+CHUNK_SIZE = 64
+
+
+def map_chunk(func: Callable[[In], Out], chunk: List[In]) -> List[Out]:
+    return [func(item) for item in chunk]
+
+
+def imap_bounded(
+    func: Callable[[In], Out],
+    iterable: Iterable[In],
+    jobs: int,
+    chunk_size: int = CHUNK_SIZE,
+    max_pending: Optional[int] = None,
+    initializer: Optional[Callable[..., Any]] = None,
+    initargs: tuple = (),
+) -> Iterator[Out]:
+    """
+    Like `Pool.imap`, but `iterable` is only read up to `max_pending` chunks
+    (by default twice the number of jobs) ahead of the results which have been
+    consumed, so memory use stays flat however long it is. Results are
+    yielded in input order. `func` must be picklable. With a single job,
+    everything runs in the current process.
+    """
+    if jobs <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in iterable:
+            yield func(item)
+        return
+    if max_pending is None:
+        max_pending = 2 * jobs
+    with ProcessPoolExecutor(
+        jobs, initializer=initializer, initargs=initargs
+    ) as executor:
+        pending: Deque[Any] = deque()
+        for chunk in chunked(iterable, chunk_size):
+            pending.append(executor.submit(map_chunk, func, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
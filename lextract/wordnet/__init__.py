@@ -13,6 +13,13 @@ def lemmas(lemma_name: str, wn: str, pos: Optional[str] = None) -> List[Lemma]:
         return wordnet.lemmas(lemma_name, pos=pos, lang=wn)
 
 
+def lemma_by_ref(wn: str, synset_name: str, lemma_name: str) -> Lemma:
+    for lemma_obj in lemmas(lemma_name, wn):
+        if lemma_obj.name() == lemma_name and lemma_obj.synset().name() == synset_name:
+            return lemma_obj
+    raise LookupError(f"No lemma {lemma_name} in {synset_name} of {wn}")
+
+
 def objify_lemmas(wn_to_lemma: Dict[str, List[str]]) -> Dict[str, List[Lemma]]:
     return {
         wn: [lemma_obj for lemma in lemma_list for lemma_obj in lemmas(lemma, wn)]
@@ -36,4 +43,10 @@ def get_lemma_names(ssof, wns):
     return {l.name() for l in lemmas}
 
 
-__all__ = ["ExtractableWordnet", "lemmas", "wn_lemma_map", "objify_lemmas"]
+__all__ = [
+    "ExtractableWordnet",
+    "lemmas",
+    "lemma_by_ref",
+    "wn_lemma_map",
+    "objify_lemmas",
+]
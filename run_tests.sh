@@ -1 +1 @@
-poetry run python -m pytest tests/keyed_db.py tests/mweproc.py
+poetry run python -m pytest tests/keyed_db.py tests/mweproc.py tests/service.py
@@ -0,0 +1,281 @@
+import random
+import time
+from typing import Any, Dict, List
+
+import click
+import conllu
+from boltons.dictutils import FrozenDict
+
+from lextract.aho_corasick.automata_utils import (
+    conf_net_search,
+    conf_net_search_simple,
+)
+from lextract.keyed_db.extract import (
+    expand_node,
+    make_tree_index,
+    select_dep_search,
+    select_dep_step,
+    select_tok_dp,
+    select_tok_step,
+)
+from lextract.keyed_db.feats import compile_lemma_feats
+from lextract.mweproc.consts import WILDCARD
+from lextract.mweproc.formatters.human import gapped_mwe
+from lextract.mweproc.models import MweType, UdMwe, UdMweToken
+
+
+def wildcard(**feats):
+    return UdMweToken(feats=feats)
+
+
+BENCH_FRAMES = [
+    UdMwe(
+        [UdMweToken("pitää"), wildcard(Case="Par"), wildcard(Case="Ess")],
+        typ=MweType.frame,
+        headword_idx=0,
+    ),
+    UdMwe(
+        [UdMweToken("pitää"), wildcard(Case="Ela"), UdMweToken("kiinni")],
+        typ=MweType.frame,
+        headword_idx=0,
+    ),
+    UdMwe(
+        [
+            UdMweToken("saada"),
+            wildcard(Case="Par"),
+            wildcard(Case="Par"),
+            UdMweToken("aikaan"),
+        ],
+        typ=MweType.frame,
+        headword_idx=0,
+    ),
+    UdMwe(
+        [
+            UdMweToken("olla"),
+            wildcard(Case="Par"),
+            wildcard(Case="Par"),
+            wildcard(Case="Par"),
+            UdMweToken("mieltä"),
+        ],
+        typ=MweType.frame,
+        headword_idx=0,
+    ),
+]
+
+# Weighted towards partitive so the wildcards have long runs to extend over
+BENCH_FEATS = [
+    {"Case": "Par", "Number": "Sing"},
+    {"Case": "Par", "Number": "Plur"},
+    {"Case": "Ela", "Number": "Sing"},
+    {"Case": "Ess", "Number": "Sing"},
+]
+BENCH_WEIGHTS = [8, 8, 1, 1]
+
+
+def frame_subwords(mwe: UdMwe):
+    return [
+        (
+            idx,
+            compile_lemma_feats(
+                {
+                    (WILDCARD if token.payload is None else token.payload): [
+                        list(token.feats.items())
+                    ]
+                }
+            ),
+        )
+        for idx, token in enumerate(mwe.tokens)
+    ]
+
+
+def random_sent(rng, mwe: UdMwe, sent_len: int):
+    sent: List[Dict[str, List[Dict[str, str]]]] = [{"x": [{}]}]
+    for _ in range(sent_len - 1):
+        sent.append({"x": rng.choices(BENCH_FEATS, BENCH_WEIGHTS)})
+    last_payload = mwe.tokens[-1].payload
+    if last_payload is not None and rng.random() < 0.5:
+        sent[-1] = {last_payload: [{}]}
+    return [compile_lemma_feats(lemma_feats) for lemma_feats in sent]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+@click.group()
+def bench():
+    pass
+
+
+@bench.command()
+@click.option("--sents", default=20)
+@click.option("--sent-len", default=25)
+@click.option("--seed", default=42)
+def keyed_toks(sents, sent_len, seed):
+    """
+    Compare select_tok_step against select_tok_dp on wildcard-heavy frames.
+    """
+    rng = random.Random(seed)
+    for mwe in BENCH_FRAMES:
+        subwords = frame_subwords(mwe)
+        key_idx = mwe.headword_idx
+        step_time = 0.0
+        dp_time = 0.0
+        num_matchings = 0
+        for _ in range(sents):
+            all_lemma_feats = random_sent(rng, mwe, sent_len)
+            elapsed, step_matchings = timed(
+                lambda: select_tok_step(
+                    lambda n: n + 1,
+                    True,
+                    all_lemma_feats,
+                    list(enumerate(subwords)),
+                    1,
+                    key_idx + 1,
+                    FrozenDict(),
+                )
+            )
+            step_time += elapsed
+            elapsed, dp_matchings = timed(
+                lambda: select_tok_dp(
+                    1, True, all_lemma_feats, subwords, 1, key_idx + 1
+                )
+            )
+            dp_time += elapsed
+            assert step_matchings == dp_matchings
+            num_matchings += len(dp_matchings)
+        print(
+            "{}: {} matchings; recursive {:.4f}s; dp {:.4f}s; speedup {:.1f}x".format(
+                gapped_mwe(mwe),
+                num_matchings,
+                step_time,
+                dp_time,
+                step_time / dp_time if dp_time else float("inf"),
+            )
+        )
+
+
+def random_tree(rng, sent_len: int):
+    lines = []
+    for idx in range(1, sent_len + 1):
+        # Shallow and bushy, attaching most tokens near the root
+        head = 0 if idx == 1 else rng.randint(1, min(idx - 1, 3))
+        lines.append(f"{idx}\tx\tx\tX\t_\t_\t{head}\tdep\t_\t_")
+    tree_index: Dict[int, Any] = {}
+    make_tree_index(conllu.parse("\n".join(lines))[0].to_tree(), tree_index)
+    return tree_index
+
+
+@bench.command()
+@click.option("--sents", default=20)
+@click.option("--sent-len", default=10)
+@click.option("--seed", default=42)
+def keyed_deps(sents, sent_len, seed):
+    """
+    Compare select_dep_step against select_dep_search on wildcard-heavy frames.
+    """
+    rng = random.Random(seed)
+    for mwe in BENCH_FRAMES:
+        subwords = frame_subwords(mwe)
+        key_idx = mwe.headword_idx
+        step_time = 0.0
+        search_time = 0.0
+        num_matchings = 0
+        for _ in range(sents):
+            all_lemma_feats = random_sent(rng, mwe, sent_len)
+            tree_index = random_tree(rng, sent_len)
+            elapsed, step_matchings = timed(
+                lambda: select_dep_step(
+                    all_lemma_feats,
+                    tree_index,
+                    subwords,
+                    expand_node(tree_index, 1),
+                    frozenset((1,)),
+                    frozenset((key_idx,)),
+                    FrozenDict(((key_idx, frozenset((0,))),)),
+                )
+            )
+            step_time += elapsed
+            elapsed, search_matchings = timed(
+                lambda: select_dep_search(
+                    all_lemma_feats, tree_index, subwords, 1, key_idx
+                )
+            )
+            search_time += elapsed
+            assert step_matchings == search_matchings
+            num_matchings += len(search_matchings)
+        print(
+            "{}: {} matchings; recursive {:.4f}s; memoised {:.4f}s; "
+            "speedup {:.1f}x".format(
+                gapped_mwe(mwe),
+                num_matchings,
+                step_time,
+                search_time,
+                step_time / search_time if search_time else float("inf"),
+            )
+        )
+
+
+@bench.command()
+@click.argument("text_in", type=click.File("r"))
+@click.option("--max-len", default=6)
+def conf_net(text_in, max_len):
+    """
+    Compare conf_net_search against conf_net_search_simple on the confusion
+    networks FinExtractor builds for each line of TEXT_IN. Lines with more than
+    --max-len tokens are skipped, since the number of pointers without pruning
+    grows exponentially.
+    """
+    from lextract.aho_corasick.fin import FinExtractor
+
+    extractor = FinExtractor()
+
+    def elem_id(elem):
+        return (elem[0], elem[1][0])
+
+    tokenised = [extractor.tokenise(line.strip()) for line in text_in]
+    sents = [surfs for surfs, _starts in tokenised if 0 < len(surfs) <= max_len]
+    simple_time = 0.0
+    pruned_time = 0.0
+    simple_pointers: List[int] = []
+    pruned_pointers: List[int] = []
+    num_elems = 0
+    for surfs, finnpos_analys in zip(sents, extractor.tag_sents(sents)):
+        net, _sources, _feats = extractor.conf_net(surfs, finnpos_analys)
+        elapsed, simple_elems = timed(
+            lambda: list(
+                conf_net_search_simple(
+                    extractor.tok_auto, net, elem_id, simple_pointers
+                )
+            )
+        )
+        simple_time += elapsed
+        elapsed, pruned_elems = timed(
+            lambda: list(
+                conf_net_search(extractor.tok_auto, net, elem_id, pruned_pointers)
+            )
+        )
+        pruned_time += elapsed
+        assert {elem_id(elem) for elem in simple_elems} == {
+            elem_id(elem) for elem in pruned_elems
+        }
+        num_elems += len(pruned_elems)
+    print("{} sentences; {} matches".format(len(sents), num_elems))
+    for name, pointers, elapsed in (
+        ("simple", simple_pointers, simple_time),
+        ("pruned", pruned_pointers, pruned_time),
+    ):
+        print(
+            "{}: {:.4f}s; live pointers per token mean {:.1f}, max {}".format(
+                name,
+                elapsed,
+                sum(pointers) / len(pointers) if pointers else 0,
+                max(pointers, default=0),
+            )
+        )
+
+
+if __name__ == "__main__":
+    bench()
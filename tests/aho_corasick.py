@@ -19,6 +19,82 @@ def _filter_toks(tagging, needle):
     ]
 
 
+def test_save_load_auto(tmp_path):
+    import ahocorasick
+    import pickle
+    from lextract.aho_corasick.common import load_auto, load_or_build_auto
+
+    path = str(tmp_path / "auto.pickle")
+    assert load_auto(path) is None
+
+    def build():
+        auto = ahocorasick.Automaton()
+        auto.add_word("kissa", ("kissa", {"fin": ["kissa"]}))
+        auto.make_automaton()
+        return auto
+
+    built = load_or_build_auto(path, build)
+    loaded = load_or_build_auto(path, lambda: None)
+    assert list(loaded.iter("iso kissa")) == list(built.iter("iso kissa"))
+    with open(path, "wb") as outf:
+        pickle.dump(-1, outf)
+        pickle.dump(built, outf)
+    assert load_auto(path) is None
+
+
+def test_conf_net_search_prunes_dominated():
+    import pyahocorasick
+    from lextract.aho_corasick.automata_utils import (
+        conf_net_search,
+        conf_net_search_simple,
+    )
+
+    auto = pyahocorasick.TokenAutomaton()
+    for tokens in [("a", "b", "c"), ("b", "c", "d"), ("c",), ("d",)]:
+        auto.add_word(tokens, (tokens, None))
+    auto.make_automaton()
+    conf_net = [{"a", "b"}, {"b", "c"}, {"c", "d"}, {"d", "a"}]
+    simple_pointers = []
+    pruned_pointers = []
+    simple = set(conf_net_search_simple(auto, conf_net, live_pointers=simple_pointers))
+    pruned = list(conf_net_search(auto, conf_net, live_pointers=pruned_pointers))
+    assert set(pruned) == simple
+    assert len(pruned) == len(simple)
+    assert pruned_pointers == [2, 2, 2, 2]
+    assert simple_pointers == [2, 4, 8, 16]
+
+    # Both "a" and "b" fall back to the "c" state on "c", so in conf_net_search
+    # the second pointer to reach it stops early, and the second time round its
+    # transition is already known and it is skipped outright. The simple search
+    # keeps every pointer but must still find the same matches.
+    auto = pyahocorasick.TokenAutomaton()
+    for tokens in [("a", "x"), ("b", "y"), ("c",)]:
+        auto.add_word(tokens, (tokens, None))
+    auto.make_automaton()
+    conf_net = [{"a", "b"}, {"c"}, {"a", "b"}, {"c", "z"}]
+    simple_pointers = []
+    pruned_pointers = []
+    simple = list(conf_net_search_simple(auto, conf_net, live_pointers=simple_pointers))
+    pruned = list(conf_net_search(auto, conf_net, live_pointers=pruned_pointers))
+    assert set(pruned) == set(simple)
+    assert len(pruned) == len(simple) == 2
+    assert pruned_pointers == [2, 1, 2, 1]
+    assert simple_pointers == [2, 2, 4, 8]
+
+
+def test_synset_groups_cached():
+    from lextract.aho_corasick.gen import _cached_synset_groups, synset_groups
+    from lextract.wordnet import objify_lemmas
+    from lextract.wordnet.fin import Wordnet as WordnetFin
+
+    wn_to_lemma = {"qf2": ["kissa"], "qwf": ["kissa"]}
+    expected = list(WordnetFin.synset_group_lemmas(objify_lemmas(wn_to_lemma)))
+    assert synset_groups(WordnetFin, wn_to_lemma) == expected
+    hits = _cached_synset_groups.cache_info().hits
+    assert synset_groups(WordnetFin, wn_to_lemma) == expected
+    assert _cached_synset_groups.cache_info().hits == hits + 1
+
+
 def test_extract_fin_saada_aikaan():
     tagging = get_extractor("FinExtractor").extract("Katso , mitä olet saanut aikaan .")
     saada_aikaan_tokens = _filter_toks(tagging, "saada_aikaan")
@@ -50,6 +126,97 @@ def test_heraa_hetkeksi():
     assert len(hetkeksi_tokens) == 1
 
 
+def test_extract_many_matches_extract():
+    extractor = get_extractor("FinExtractor")
+    lines = ["Katso , mitä olet saanut aikaan .", "", "murhamies"]
+    for batched, single in zip(
+        extractor.extract_many(lines, batch_size=2),
+        (extractor.extract(line) for line in lines),
+    ):
+        assert list(batched.iter_tags()) == list(single.iter_tags())
+
+
+def test_extract_fin_light():
+    import pickle
+
+    extractor = get_extractor("FinExtractor")
+    line = "Katso , mitä olet saanut aikaan ."
+    full = extractor.extract(line)
+    light = extractor.extract(line, light=True)
+    assert light.canon_synset_id_set() == full.canon_synset_id_set()
+    full_tags = list(full.iter_tags())
+    light_tags = list(light.iter_tags())
+    assert len(light_tags) == len(full_tags)
+    for (_, full_tag), (_, light_tag) in zip(full_tags, light_tags):
+        assert light_tag.lemma == full_tag.lemma
+        assert light_tag.wn_synset_names == full_tag.wn_synset_names
+        assert light_tag.lemma_objs == full_tag.lemma_objs
+    unpickled = pickle.loads(pickle.dumps(light))
+    assert list(unpickled.iter_tags()) == light_tags
+
+
+def test_fin_extractor_restarts_finnpos_after_fork(monkeypatch):
+    import lextract.aho_corasick.fin as fin
+
+    class DummyFinnPOS:
+        def __init__(self):
+            self.sents = []
+
+        def feed_sent(self, sent):
+            self.sents.append(sent)
+
+        def get_analys(self):
+            return [(tok, tok, {}) for tok in self.sents.pop(0)]
+
+    monkeypatch.setattr(fin, "FinnPOS", DummyFinnPOS)
+    extractor = get_extractor("FinExtractor")
+    monkeypatch.setattr(extractor, "finnpos", None)
+    assert extractor.tag_sents([["kissa"]]) == [[("kissa", "kissa", {})]]
+    parent_finnpos = extractor.finnpos
+    extractor.tag_sents([["koira"]])
+    assert extractor.finnpos is parent_finnpos
+    # As if the extractor had been inherited by a forked child
+    monkeypatch.setattr(extractor, "finnpos_pid", -1)
+    assert extractor.tag_sents([["koira"]]) == [[("koira", "koira", {})]]
+    assert extractor.finnpos is not parent_finnpos
+
+
+def test_extract_corpus_in_order():
+    from lextract.aho_corasick import extract_corpus
+
+    lines = [
+        "Katso , mitä olet saanut aikaan .",
+        "murhamies",
+        "Älä koskaan sano mitään tuollaista hänestä !",
+    ] * 3
+    expected = [get_extractor("FinExtractor").extract(line) for line in lines]
+    actual = list(extract_corpus(lines, jobs=2, chunk_size=2))
+    assert len(actual) == len(expected)
+    for actual_tagging, expected_tagging in zip(actual, expected):
+        assert [tok.token for tok in actual_tagging.tokens] == [
+            tok.token for tok in expected_tagging.tokens
+        ]
+        assert list(actual_tagging.iter_tags()) == list(expected_tagging.iter_tags())
+
+
+def test_runner_worker_drops_inherited_extractor(monkeypatch):
+    import os
+    import lextract.aho_corasick as aho_corasick
+    from lextract.aho_corasick.runner import init_worker
+
+    class DummyExtractor:
+        pass
+
+    inherited = DummyExtractor()
+    monkeypatch.setattr(aho_corasick, "DummyExtractor", DummyExtractor, raising=False)
+    monkeypatch.setitem(aho_corasick._registry, "DummyExtractor", inherited)
+    init_worker("DummyExtractor", os.getpid())
+    assert aho_corasick._registry["DummyExtractor"] is inherited
+    # As if in a worker forked from another process
+    init_worker("DummyExtractor", -1)
+    assert aho_corasick._registry["DummyExtractor"] is not inherited
+
+
 def test_extract_zh_hollywood():
     zh_tok = "好莱坞"
     zh_untok = "好莱坞"
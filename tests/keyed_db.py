@@ -10,7 +10,13 @@ from lextract.mweproc.db.queries import mwe_for_indexing
 from lextract.mweproc.models import MweType, UdMwe, UdMweToken
 from lextract.mweproc.sources.common import build_simple_mwe
 from lextract.keyed_db.builddb import add_keyed_words, IndexingResult
-from lextract.keyed_db.extract import extract_deps, extract_toks
+from lextract.keyed_db.extract import (
+    extract_deps,
+    extract_deps_batch,
+    extract_toks,
+    extract_toks_batch,
+)
+from lextract.keyed_db.index import KeyedMatcherIndex
 
 fd = FrozenDict
 
@@ -46,7 +52,7 @@ def create_db(db_path):
     return session
 
 
-def create_phrase_test_db(db_path):
+def create_phrase_test_db(db_path, **index_kwargs):
     session = create_db(db_path)
     hw_cnts_cache = {}
     for word in TEST_WORDS:
@@ -54,7 +60,9 @@ def create_phrase_test_db(db_path):
         insert_mwe(session, mwe, hw_cnts_cache, freqs=False, materialize=True)
     session.commit()
     mwe_it = session.execute(mwe_for_indexing())
-    for indexing_result in add_keyed_words(session, mwe_it, True, True, False):
+    for indexing_result in add_keyed_words(
+        session, mwe_it, True, True, False, **index_kwargs
+    ):
         assert indexing_result != IndexingResult.FAIL
     session.commit()
     return session
@@ -76,7 +84,7 @@ TEST_FRAMES = [
 ]
 
 
-def create_frame_test_db(db_path):
+def create_frame_test_db(db_path, **index_kwargs):
     session = create_db(db_path)
     hw_cnts_cache = {}
     for gapped, headword_idx, subwords in TEST_FRAMES:
@@ -90,7 +98,9 @@ def create_frame_test_db(db_path):
         insert_mwe(session, mwe, hw_cnts_cache, freqs=False, materialize=True)
     session.commit()
     mwe_it = session.execute(mwe_for_indexing())
-    for indexing_result in add_keyed_words(session, mwe_it, True, True, False):
+    for indexing_result in add_keyed_words(
+        session, mwe_it, True, True, False, **index_kwargs
+    ):
         assert indexing_result != IndexingResult.FAIL
     session.commit()
     return session
@@ -106,6 +116,11 @@ def frame_testdb():
     return create_frame_test_db("sqlite://")
 
 
+@pytest.fixture(scope="module")
+def frame_testindex(frame_testdb):
+    return KeyedMatcherIndex.load(frame_testdb)
+
+
 def test_insert_worked(phrase_testdb):
     from lextract.keyed_db.tables import tables
 
@@ -239,8 +254,12 @@ def test_dep_matches(phrase_testdb, use_conllu_feats, conll, expected_matches):
         ),
     ],
 )
-def test_token_frame_matches(frame_testdb, toks, expected_matches):
-    matches = list(extract_toks(frame_testdb, toks))
+@pytest.mark.parametrize("use_index", [False, True])
+def test_token_frame_matches(
+    frame_testdb, frame_testindex, use_index, toks, expected_matches
+):
+    conn = frame_testindex if use_index else frame_testdb
+    matches = list(extract_toks(conn, toks))
     assert_token_matches(frame_testdb, matches, expected_matches)
 
 
@@ -254,12 +273,396 @@ def test_token_frame_matches(frame_testdb, toks, expected_matches):
         (CONLLS[4], {"kummuta ___-sta": fd({0: fs(3), 1: fs(0)})}),
     ],
 )
-def test_dep_frame_matches(frame_testdb, use_conllu_feats, conll, expected_matches):
+@pytest.mark.parametrize("use_index", [False, True])
+def test_dep_frame_matches(
+    frame_testdb, frame_testindex, use_index, use_conllu_feats, conll, expected_matches
+):
     sent = conllu.parse(conll)[0]
-    matches = list(extract_deps(frame_testdb, sent, use_conllu_feats=use_conllu_feats))
+    conn = frame_testindex if use_index else frame_testdb
+    matches = list(extract_deps(conn, sent, use_conllu_feats=use_conllu_feats))
     assert_dep_matches(frame_testdb, matches, expected_matches)
 
 
+FRAME_TOKS = [
+    ["Minä", "pidän", "voileipäkakusta"],
+    ["Minä", "voin", "pitää", "laukustasi", "kiinni", "."],
+    ["Minä", "pidän", "siistiä", "ihmisiä", "vihamielisinä"],
+]
+
+
+def test_token_batch_matches_single(frame_testdb):
+    batched = list(extract_toks_batch(frame_testdb, FRAME_TOKS, window=2))
+    assert len(batched) == len(FRAME_TOKS)
+    for toks, batch_matches in zip(FRAME_TOKS, batched):
+        single_matches = list(extract_toks(frame_testdb, toks))
+        assert len(batch_matches) == len(single_matches)
+        for match in batch_matches:
+            assert match in single_matches
+
+
+@pytest.mark.parametrize("use_conllu_feats", [False, True])
+def test_dep_batch_matches_single(frame_testdb, use_conllu_feats):
+    sents = [conllu.parse(conll)[0] for conll in CONLLS]
+    batched = list(
+        extract_deps_batch(
+            frame_testdb, sents, use_conllu_feats=use_conllu_feats, window=2
+        )
+    )
+    assert len(batched) == len(sents)
+    for sent, batch_matches in zip(sents, batched):
+        single_matches = list(
+            extract_deps(frame_testdb, sent, use_conllu_feats=use_conllu_feats)
+        )
+        assert len(batch_matches) == len(single_matches)
+        for match in batch_matches:
+            assert match in single_matches
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_key2_matches_same(frame_testdb, use_index):
+    key2_testdb = create_frame_test_db("sqlite://", key2_min_freq=0)
+    conn = KeyedMatcherIndex.load(key2_testdb) if use_index else key2_testdb
+    index = KeyedMatcherIndex.load(key2_testdb)
+    key2_mwe_ids = {
+        key2_lemma: {index.words[word_id]["ud_mwe_id"] for word_id in word_ids}
+        for key2_lemma, word_ids in index.key_lemmas["pitää"].items()
+    }
+    assert key2_mwe_ids == {None: {1, 3}, "kiinni": {2}}
+    for toks in FRAME_TOKS + [["Minä", "pidän", "laukustasi"]]:
+        matches = list(extract_toks(conn, toks))
+        expected_matches = list(extract_toks(frame_testdb, toks))
+        assert len(matches) == len(expected_matches)
+        for match in matches:
+            assert match in expected_matches
+
+
+@pytest.mark.parametrize(
+    "create_test_db", [create_phrase_test_db, create_frame_test_db]
+)
+def test_index_jobs_agree(monkeypatch, create_test_db):
+    from functools import partial
+    from lextract.keyed_db import builddb
+    from lextract.keyed_db.freqs import CorpusFreqs
+    from lextract.keyed_db.tables import tables
+    from lextract.utils.parallel import imap_bounded
+
+    # Spread the MWEs over both workers so that results must be reordered
+    monkeypatch.setattr(builddb, "imap_bounded", partial(imap_bounded, chunk_size=1))
+    freq = CorpusFreqs({"kiinni": 10, "humalaan": 20})
+    dumps = []
+    for jobs in (1, 2):
+        session = create_test_db("sqlite://", jobs=jobs, freq=freq, key2_min_freq=0)
+        dumps.append(
+            {
+                table: session.execute(
+                    select([tables[table]]).order_by(*tables[table].primary_key)
+                ).fetchall()
+                for table in ("word", "subword", "key_lemma", "key2_lemma")
+            }
+        )
+    assert dumps[0] == dumps[1]
+    assert dumps[0]["key2_lemma"]
+
+
+def test_rekey_adds_key2():
+    from lextract.keyed_db.builddb import load_word_keys
+
+    session = create_frame_test_db("sqlite://")
+    results = list(
+        add_keyed_words(
+            session,
+            session.execute(mwe_for_indexing()),
+            word_keys=load_word_keys(session),
+            key2_min_freq=0,
+        )
+    )
+    assert results.count(IndexingResult.UNCHANGED) == len(TEST_FRAMES) - 1
+    word_keys = load_word_keys(session)
+    assert word_keys[2][1:] == (0, True, frozenset({"kiinni"}))
+    assert word_keys[1][1:] == (0, True, None)
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_missing_key2_table(frame_testdb, use_index):
+    from lextract.keyed_db.builddb import load_word_keys
+
+    old_testdb = create_frame_test_db("sqlite://")
+    old_testdb.execute("DROP TABLE key2_lemma")
+    assert load_word_keys(old_testdb)[2][1:] == (0, True, None)
+    conn = KeyedMatcherIndex.load(old_testdb) if use_index else old_testdb
+    for toks in FRAME_TOKS:
+        matches = list(extract_toks(conn, toks))
+        expected_matches = list(extract_toks(frame_testdb, toks))
+        assert len(matches) == len(expected_matches)
+        for match in matches:
+            assert match in expected_matches
+
+
+MWT_CONLL = """
+# sent_id = mwt
+1-2	Pidänkö	_	_	_	_	_	_	_	_
+1	Pidän	pitää	VERB	_	Mood=Ind|Number=Sing|Person=1|Tense=Pres|VerbForm=Fin|Voice=Act	0	root	_	_
+2	kö	kö	PART	_	Clitic=Ko	1	advmod	_	_
+3	minä	minä	PRON	_	Case=Nom|Number=Sing|Person=1|PronType=Prs	1	nsubj	_	_
+4	voileipäkakusta	voi#leipä#kakku	NOUN	_	Case=Ela|Number=Sing	1	nmod	_	_
+5	?	?	PUNCT	_	_	1	punct	_	_
+""".strip()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_extract_conllu_cmd(tmp_path, monkeypatch, jobs):
+    import json
+    from click.testing import CliRunner
+    from lextract.keyed_db.repl import extract_conllu_cmd
+
+    db_path = "sqlite:///" + str(tmp_path / "frames.db")
+    create_frame_test_db(db_path)
+    monkeypatch.setenv("DATABASE_URL", db_path)
+    conllu_path = tmp_path / "in.conllu"
+    conllu_path.write_text(MWT_CONLL + "\n\n" + CONLLS[1] + "\n\n")
+    result = CliRunner().invoke(
+        extract_conllu_cmd,
+        [
+            str(conllu_path),
+            "-",
+            "--use-conllu-feats",
+            "--jobs",
+            str(jobs),
+            "--chunk-size",
+            "1",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert records == [
+        {"sent_id": "mwt", "ud_mwe_id": 3, "tokens": [[0], [3]]},
+        {"sent_id": "1", "ud_mwe_id": 3, "tokens": [[1], [2]]},
+    ]
+
+
+def test_matcher_cache_is_shared(frame_testdb):
+    toks = ["Minä", "pidän", "voileipäkakusta"]
+    matcher_cache = {}
+    matches = list(extract_toks(frame_testdb, toks, matcher_cache=matcher_cache))
+    assert "pitää" in matcher_cache
+    # Everything is cached now, so no connection is needed
+    cached_matches = list(extract_toks(None, toks, matcher_cache=matcher_cache))
+    assert len(cached_matches) == len(matches)
+    for match in cached_matches:
+        assert match in matches
+
+
+def test_bounded_matcher_cache(frame_testdb):
+    from boltons.cacheutils import LRU
+    from lextract.keyed_db.extract import resolve_matchers
+
+    lemmas = ["pitää", "kummuta", "kissa", "pitää"]
+    matcher_cache = LRU(max_size=1)
+    matchers = resolve_matchers(frame_testdb, lemmas, matcher_cache)
+    assert len(matcher_cache) == 1
+    assert matchers["pitää"] and matchers["kummuta"]
+    assert matchers == resolve_matchers(frame_testdb, lemmas)
+
+
+def test_index_loads_all_words(phrase_testdb):
+    index = KeyedMatcherIndex.load(phrase_testdb)
+    assert len(index) == len(TEST_WORDS)
+    key_lemmas, words = index.get_matchers(["tulla", "humala", "kissa"])
+    assert "kissa" not in key_lemmas
+    for buckets in key_lemmas.values():
+        for word_ids in buckets.values():
+            for word_id in word_ids:
+                assert word_id in words
+
+
+def test_compiled_feats_subset():
+    from lextract.keyed_db.feats import any_subset, compile_feats, compile_feats_list
+
+    ela = compile_feats({"Case": "Ela"})
+    ela_sing = compile_feats([("Case", "Ela"), ("Number", "Sing")])
+    assert compile_feats([["Number", "Sing"], ["Case", "Ela"]]) == ela_sing
+    assert compile_feats([]) == 0
+    assert any_subset((ela,), (ela_sing,))
+    assert not any_subset((ela_sing,), (ela,))
+    assert any_subset((0,), (ela,))
+    assert not any_subset((0,), ())
+    assert compile_feats_list([{"Case": "Ela"}, [("Case", "Ela")]]) == (ela,)
+
+
+def test_select_tok_dp_agrees_with_recursion():
+    from lextract.keyed_db.extract import select_tok_dp, select_tok_step
+    from lextract.keyed_db.feats import compile_lemma_feats
+    from lextract.mweproc.consts import WILDCARD
+
+    par = [[("Case", "Par")]]
+    subwords = [
+        (0, compile_lemma_feats({"olla": [[]]})),
+        (1, compile_lemma_feats({WILDCARD: par})),
+        (2, compile_lemma_feats({WILDCARD: par})),
+        (3, compile_lemma_feats({"mieltä": [[]]})),
+    ]
+    all_lemma_feats = [compile_lemma_feats({"olla": [[]]})]
+    all_lemma_feats += [compile_lemma_feats({"x": par})] * 5
+    all_lemma_feats += [compile_lemma_feats({"mieltä": [[]]})]
+    for extend_wildcards in (False, True):
+        expected = select_tok_step(
+            lambda n: n + 1,
+            extend_wildcards,
+            all_lemma_feats,
+            list(enumerate(subwords)),
+            1,
+            1,
+            fd(),
+        )
+        actual = select_tok_dp(1, extend_wildcards, all_lemma_feats, subwords, 1, 1)
+        assert actual == expected
+    # 4 ways to split 5 partitives between the 2 wildcards
+    assert len(actual) == 4
+    assert fd({1: fs(1), 2: fs(2, 3, 4, 5), 3: fs(6)}) in actual
+
+
+def test_select_dep_search_agrees_with_recursion():
+    from lextract.keyed_db.extract import (
+        DepSearchBudgetExceeded,
+        expand_node,
+        make_tree_index,
+        select_dep_search,
+        select_dep_step,
+    )
+    from lextract.keyed_db.feats import compile_lemma_feats
+    from lextract.mweproc.consts import WILDCARD
+
+    par = [[("Case", "Par")]]
+    subwords = [
+        (0, compile_lemma_feats({"olla": [[]]})),
+        (1, compile_lemma_feats({WILDCARD: par})),
+        (2, compile_lemma_feats({WILDCARD: par})),
+        (3, compile_lemma_feats({"mieltä": [[]]})),
+    ]
+    # olla <- 4 partitives, the last of which has a partitive dependent
+    heads = [0, 1, 1, 1, 1, 5, 1]
+    sent = conllu.parse(
+        "\n".join(
+            f"{idx}\tx\tx\tX\t_\t_\t{head}\tdep\t_\t_"
+            for idx, head in enumerate(heads, 1)
+        )
+    )[0]
+    tree_index = {}
+    make_tree_index(sent.to_tree(), tree_index)
+    all_lemma_feats = [compile_lemma_feats({"olla": [[]]})]
+    all_lemma_feats += [compile_lemma_feats({"x": par})] * 5
+    all_lemma_feats += [compile_lemma_feats({"mieltä": [[]]})]
+    expected = select_dep_step(
+        all_lemma_feats,
+        tree_index,
+        subwords,
+        expand_node(tree_index, 1),
+        fs(1),
+        fs(0),
+        fd({0: fs(0)}),
+    )
+    actual = select_dep_search(all_lemma_feats, tree_index, subwords, 1, 0)
+    assert actual == expected
+    # Wildcards extend along dependencies rather than over siblings
+    assert fd({0: fs(0), 1: fs(1), 2: fs(4, 5), 3: fs(6)}) in actual
+    assert fd({0: fs(0), 1: fs(1, 2), 2: fs(3), 3: fs(6)}) not in actual
+    # No token can match a missing lemma, so there is nothing to search
+    missing = subwords + [(4, compile_lemma_feats({"puolta": [[]]}))]
+    assert select_dep_search(all_lemma_feats, tree_index, missing, 1, 0) == set()
+    with pytest.raises(DepSearchBudgetExceeded):
+        select_dep_search(all_lemma_feats, tree_index, subwords, 1, 0, max_states=3)
+
+
+def test_dep_search_budget_is_opt_in(frame_testdb):
+    sent = conllu.parse(CONLLS[1])[0]
+    assert list(extract_deps(frame_testdb, sent, use_conllu_feats=True))
+    assert not list(
+        extract_deps(frame_testdb, sent, use_conllu_feats=True, max_states=0)
+    )
+
+
+def test_lemma_disk_cache(tmp_path):
+    from lextract.utils.lemmatise import LemmaDiskCache
+
+    path = str(tmp_path / "lemmas.sqlite")
+    result = {"koira": fs((("Case", "Ine"), ("Number", "Plur")))}
+    cache = LemmaDiskCache(path)
+    assert cache.get("koirissa", False) is None
+    cache.put("koirissa", False, result)
+    assert cache.get("koirissa", False) == result
+    assert cache.get("koirissa", True) is None
+    cache.flush()
+    assert LemmaDiskCache(path).get("koirissa", False) == result
+
+
+def _fill_lemma_disk_cache(path, prefix, num, barrier):
+    from lextract.utils.lemmatise import LemmaDiskCache
+
+    cache = LemmaDiskCache(path)
+    for idx in range(num):
+        cache.put(f"{prefix}{idx}", False, {f"{prefix}{idx}": fs()})
+        # Read in between as fi_lemmatise would
+        cache.get(f"{prefix}{idx + 1}", False)
+    # Both processes are now in the middle of writing
+    barrier.wait(30)
+    for idx in range(num, num * 2):
+        cache.put(f"{prefix}{idx}", False, {f"{prefix}{idx}": fs()})
+    cache.flush()
+
+
+def test_lemma_disk_cache_concurrent_writers(tmp_path):
+    import multiprocessing as mp
+    from lextract.utils.lemmatise import DISK_CACHE_COMMIT_EVERY, LemmaDiskCache
+
+    path = str(tmp_path / "lemmas.sqlite")
+    num = DISK_CACHE_COMMIT_EVERY + DISK_CACHE_COMMIT_EVERY // 2
+    barrier = mp.Barrier(2)
+    procs = [
+        mp.Process(target=_fill_lemma_disk_cache, args=(path, prefix, num, barrier))
+        for prefix in ("a", "b")
+    ]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+        assert proc.exitcode == 0
+    cache = LemmaDiskCache(path)
+    for prefix in ("a", "b"):
+        for idx in (0, num, num * 2 - 1):
+            assert cache.get(f"{prefix}{idx}", False) == {f"{prefix}{idx}": fs()}
+
+
+def _put_lemma(surf):
+    from lextract.utils.lemmatise import get_lemma_cache
+
+    get_lemma_cache().put(surf, False, {surf: fs()})
+
+
+def test_lemma_disk_cache_flushed_by_pool_workers(tmp_path):
+    import multiprocessing as mp
+    from lextract.utils.lemmatise import LemmaDiskCache, set_lemma_cache
+
+    path = str(tmp_path / "lemmas.sqlite")
+    surfs = [f"kissa{idx}" for idx in range(10)]
+    pool = mp.Pool(2, initializer=set_lemma_cache, initargs=(path,))
+    pool.map(_put_lemma, surfs)
+    # Workers leave with os._exit once their tasks run out
+    pool.close()
+    pool.join()
+    cache = LemmaDiskCache(path)
+    for surf in surfs:
+        assert cache.get(surf, False) == {surf: fs()}
+
+
+def test_fi_lemmatise_returns_copies():
+    from lextract.utils.lemmatise import fi_lemmatise
+
+    lemmas = fi_lemmatise("humalassa")
+    lemmas["humala"].add((("Case", "Ill"),))
+    lemmas["kissa"] = set()
+    assert fi_lemmatise("Humalassa") == fi_lemmatise("humalassa") != lemmas
+
+
 def test_longest_matches():
     from lextract.keyed_db.extract import longest_matches
 
@@ -278,3 +681,95 @@ def test_olla_must():
     session.commit()
     last_row = list(session.execute(mwe_for_indexing()))[-1]
     assert last_row[-1] == {"Tense": "Pres", "Voice": "Pass", "VerbForm": "Part"}
+
+
+def test_incremental_index():
+    from lextract.keyed_db.builddb import delete_words, load_word_keys
+    from lextract.keyed_db.queries import (
+        orphaned_word_ids_query,
+        unindexed_mwe_for_indexing,
+    )
+    from lextract.keyed_db.tables import tables
+
+    session = create_phrase_test_db("sqlite://")
+    word = tables["word"]
+    hw_cnts_cache = {}
+    insert_mwe(
+        session,
+        mk_test_mwe(("tulla",), 0),
+        hw_cnts_cache,
+        freqs=False,
+        materialize=True,
+    )
+    session.commit()
+    results = list(
+        add_keyed_words(session, session.execute(unindexed_mwe_for_indexing()))
+    )
+    assert len(results) == 1
+    assert session.execute(select([func.count(word.c.id)])).scalar() == 6
+
+    session.execute(
+        word.update().where(word.c.ud_mwe_id == 1).values(key_idx=1, key_is_head=False)
+    )
+    results = list(
+        add_keyed_words(
+            session,
+            session.execute(mwe_for_indexing()),
+            word_keys=load_word_keys(session),
+        )
+    )
+    assert results.count(IndexingResult.UNCHANGED) == 5
+    assert load_word_keys(session)[1][1:] == (0, True, None)
+    assert not list(session.execute(orphaned_word_ids_query()))
+
+    delete_words(session, [load_word_keys(session)[1][0]])
+    assert session.execute(select([func.count(word.c.id)])).scalar() == 5
+
+
+def test_get_key_idx_uses_corpus_freqs(tmp_path):
+    from lextract.keyed_db.builddb import get_key_idx
+    from lextract.keyed_db.freqs import CorpusFreqs, key_fanout
+    from lextract.mweproc.consts import WILDCARD
+
+    subword_keys = [{"pitää": set()}, {WILDCARD: set()}, {"kiinni": set()}]
+    path = str(tmp_path / "freqs.tsv")
+    CorpusFreqs({"pitää": 10, "kiinni": 100}).dump(path)
+    freqs = CorpusFreqs.load(path)
+    assert get_key_idx(subword_keys, freqs) == 0
+    assert get_key_idx(subword_keys, CorpusFreqs({"pitää": 10})) == 2
+    # A subword whose payload has no analyses cannot be a key
+    assert get_key_idx([{}, {"kiinni": set()}], freqs) == 1
+    assert key_fanout([("pitää", 3), ("kiinni", 1)], freqs) == [
+        ("kiinni", 1, 100 / 110),
+        ("pitää", 3, 30 / 110),
+    ]
+
+
+def test_key_subwords_keys_rarest_lemma():
+    from lextract.keyed_db.builddb import key_subwords
+
+    # ottaa [jonkun] vaari: the wildcard's Case feature is not a lemma and the
+    # rarest lemma is keyed rather than the first subword without features
+    subwords_list = [
+        ("ottaa", False, [], {}),
+        (None, False, [], {"Case": "Gen"}),
+        ("vaari", False, [], {}),
+    ]
+    key_idx, key_is_head, subword_keys = key_subwords(
+        subwords_list, None, lemmatise=lambda word: {word: set()}
+    )
+    assert (key_idx, key_is_head) == (2, False)
+    assert set(subword_keys[key_idx]) == {"vaari"}
+
+
+def test_read_only_connection(tmp_path):
+    from sqlalchemy.exc import OperationalError
+    from lextract.utils.db import get_connection
+
+    db_path = "sqlite:///" + str(tmp_path / "read.db")
+    get_connection(db_path).execute("CREATE TABLE t (a INTEGER)")
+    conn = get_connection(db_path, read_only=True)
+    assert conn.engine is get_connection(db_path, read_only=True).engine
+    assert conn.execute("PRAGMA query_only").scalar() == 1
+    with pytest.raises(OperationalError):
+        conn.execute("INSERT INTO t VALUES (1)")
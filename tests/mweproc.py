@@ -156,3 +156,46 @@ def test_olla_must_mwes():
         "Voice": "Pass",
         "VerbForm": "Part",
     }
+
+
+def test_bulk_insert_matches_insert():
+    from sqlalchemy import select
+    from wikiparse.utils.db import get_session
+    from lextract.mweproc.db.confs import setup_dist
+    from lextract.mweproc.db.muts import insert_mwe, insert_prepared_mwe, prepare_mwe
+    from lextract.mweproc.db.tables import metadata, tables
+    from lextract.mweproc.models import UdMwe, UdMweToken
+    from lextract.utils.db import BulkInserter
+
+    setup_dist()
+    mwes = [
+        UdMwe(
+            [UdMweToken(headword), UdMweToken(None, feats={"Case": "Par"})],
+            typ=MweType.frame,
+            headword_idx=0,
+        )
+        for headword in ["pitää", "olla", "pitää"]
+    ]
+    mwes.append(UdMwe([UdMweToken("iso"), UdMweToken("kissa")], typ=MweType.multiword))
+
+    def dump(session):
+        return {
+            name: session.execute(select([tables[name]])).fetchall()
+            for name in ["ud_mwe", "ud_mwe_token", "mwe_fmt", "headword_freq"]
+        }
+
+    sessions = []
+    for _ in range(2):
+        session = get_session("sqlite://")
+        metadata.create_all(session().get_bind().engine)
+        sessions.append(session)
+    for mwe in mwes:
+        insert_mwe(sessions[0], mwe, {}, freqs=True, materialize=True)
+    inserter = BulkInserter(sessions[1])
+    headword_freq_ids = {}
+    for mwe in mwes:
+        prepared = prepare_mwe(mwe, freqs=True, materialize=True)
+        insert_prepared_mwe(inserter, prepared, headword_freq_ids)
+    inserter.flush()
+    assert dump(sessions[0]) == dump(sessions[1])
+    assert len(headword_freq_ids) == 2
@@ -0,0 +1,167 @@
+import asyncio
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+
+import orjson
+
+from lextract.service import ExtractionService
+
+
+class StubPool(Executor):
+    """
+    Runs tasks immediately in the current process, recording the batches.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def submit(self, func, *args):
+        if args:
+            self.batches.append(list(args[0]))
+        fut: Future = Future()
+        try:
+            fut.set_result(func(*args))
+        except Exception as exc:
+            fut.set_exception(exc)
+        return fut
+
+
+class StubWriter:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def double(items):
+    if 0 in items:
+        raise ValueError("Zero")
+    return [item * 2 for item in items]
+
+
+def exit_worker(items):
+    os._exit(1)
+
+
+def request(path, body, method="POST"):
+    head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n"
+    return head.encode("ascii") + body
+
+
+def parse_responses(data):
+    responses = []
+    while data:
+        head, _, rest = data.partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("ascii").split("\r\n")
+        headers = dict(line.split(": ", 1) for line in header_lines)
+        length = int(headers["Content-Length"])
+        responses.append((int(status_line.split()[1]), orjson.loads(rest[:length])))
+        data = rest[length:]
+    return responses
+
+
+def run_conn(requests, max_batch=None, pool=None, use_keyed=False):
+    if pool is None:
+        pool = StubPool()
+
+    async def run():
+        service = ExtractionService(pool, 1, False, use_keyed)
+
+        async def handle_double(body):
+            return {"out": await service.batchers["/double"].submit_many(body["xs"])}
+
+        async def handle_exit(body):
+            return await service.batchers["/exit"].submit(None)
+
+        service.add_route("/double", double, handle_double)
+        service.add_route("/exit", exit_worker, handle_exit)
+        if max_batch is not None:
+            service.batchers["/double"].max_batch = max_batch
+        await service.warmup()
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"".join(requests))
+        reader.feed_eof()
+        writer = StubWriter()
+        await asyncio.wait_for(service.handle_conn(reader, writer), 60)
+        assert writer.closed
+        return parse_responses(writer.data), getattr(pool, "batches", None)
+
+    return asyncio.run(run())
+
+
+def test_service_batches_items():
+    responses, batches = run_conn(
+        [
+            request("/double", b'{"xs": [1, 2, 3]}'),
+            request("/health", b"", method="GET"),
+            request("/double", b'{"xs": [4]}'),
+        ]
+    )
+    assert responses == [
+        (200, {"out": [2, 4, 6]}),
+        (200, {"ok": True}),
+        (200, {"out": [8]}),
+    ]
+    assert batches == [[1, 2, 3], [4]]
+
+
+def test_service_splits_batches():
+    responses, batches = run_conn(
+        [request("/double", b'{"xs": [1, 2, 3]}')], max_batch=2
+    )
+    assert responses == [(200, {"out": [2, 4, 6]})]
+    assert batches == [[1, 2], [3]]
+
+
+def test_service_errors():
+    responses, _ = run_conn(
+        [
+            request("/nope", b"{}"),
+            request("/double", b"{"),
+            request("/double", b"[]"),
+            request("/double", b'{"xs": [0]}'),
+            request("/double", b"{}", method="GET"),
+        ]
+    )
+    assert [status for status, _ in responses] == [404, 400, 400, 500, 405]
+
+
+def test_service_bad_content_length():
+    for length in (b"ten", b"-1"):
+        responses, _ = run_conn(
+            [
+                b"POST /double HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n",
+                request("/double", b'{"xs": [1]}'),
+            ]
+        )
+        assert responses == [(400, {"error": "Bad Content-Length"})]
+
+
+def test_service_worker_dies():
+    with ProcessPoolExecutor(1) as pool:
+        responses, _ = run_conn(
+            [request("/exit", b"{}"), request("/double", b'{"xs": [1]}')], pool=pool
+        )
+    assert [status for status, _ in responses] == [500, 500]
+    assert "BrokenProcessPool" in responses[0][1]["error"]
+
+
+def test_service_bad_conllu():
+    responses, _ = run_conn(
+        [
+            request("/keyed/deps", b'{"conllu": "garbage"}'),
+            request("/keyed/deps", b'{"conllu": ""}'),
+        ],
+        use_keyed=True,
+    )
+    assert responses[0][0] == 400
+    assert responses[0][1]["error"].startswith("Invalid CoNLL-U")
+    assert responses[1] == (200, {"matches": []})